@@ -0,0 +1,431 @@
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+import socketserver
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from git_objects import DEFAULT_DELTA_CACHE_BYTES, open_object_store
+from artifact_cache import DEFAULT_CACHE_BYTES
+from git_archive_by_date import archive_git_history, get_file_list_preview, resolve_commit
+from job_scheduler import JobScheduler, parse_priority, request_key
+
+# Long-running local service that accepts archive and preview jobs in the
+# archive_git_history() params shape. Repositories stay open between jobs so
+# refs, commit metadata, blob readers and the delta-base cache remain warm.
+#
+#   POST   /jobs              {"type": "archive"|"preview", "params": {...}, "stream": true,
+#                              "priority": "high"|"normal"|"low"}
+#   GET    /jobs/<id>         job status and result
+#   GET    /jobs/<id>/events  progress/log events as newline-delimited JSON
+#   DELETE /jobs/<id>         cancel a job
+#   GET    /health            service status
+
+JOB_TYPES = ('archive', 'preview')
+# Params that only make sense in-process and must never come from a client
+INTERNAL_PARAMS = ('log_callback', 'progress_callback', 'cancel_event', 'object_store')
+MAX_FINISHED_JOBS = 200
+
+
+class RepositoryCache:
+    """Keeps up to max_repos object stores open, least recently used evicted first."""
+
+    def __init__(self, max_repos=8, delta_cache_bytes=DEFAULT_DELTA_CACHE_BYTES):
+        self.max_repos = max_repos
+        self.delta_cache_bytes = delta_cache_bytes
+        self._stores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, repo_path, log_callback=print):
+        """Return a warm store for a repository, or None if it cannot be opened in-process."""
+        key = os.path.realpath(repo_path)
+        with self._lock:
+            store = self._stores.get(key)
+            if store is not None:
+                self._stores.move_to_end(key)
+                store.refresh()
+                return store
+            store = open_object_store(repo_path, log_callback, self.delta_cache_bytes)
+            if store is None:
+                return None
+            self._stores[key] = store
+            # Evicted stores are not closed: a running job may still hold them,
+            # and their mmaps are released once they are garbage collected.
+            while len(self._stores) > self.max_repos:
+                self._stores.popitem(last=False)
+            return store
+
+    def repos(self):
+        with self._lock:
+            return list(self._stores)
+
+
+class Job:
+    """
+    One archive or preview request and the events it has produced so far.
+    Identical requests submitted while this job is in flight become its
+    followers and receive the same events and result. A leader whose own
+    client cancels is detached: it reports 'cancelled' but keeps running
+    until its followers are gone too.
+    """
+
+    def __init__(self, kind, params, priority=1, key=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params
+        self.priority = priority
+        self.key = key
+        self.repo = os.path.realpath(params['repo_path'])
+        self.status = 'queued'
+        self.result = None
+        self.coalesced_with = None
+        self.created = time.time()
+        self.cancel_event = threading.Event()
+        self.events = []
+        self.followers = []
+        self.detached = False
+        self._cond = threading.Condition()
+
+    def add_follower(self, job):
+        """Attach an identical job; returns False if this job is already being cancelled."""
+        with self._cond:
+            if self.cancel_event.is_set():
+                return False
+            job.coalesced_with = self.id
+            job.status = self.status
+            self.followers.append(job)
+            history = [dict(event) for event in self.events]
+        job.emit({'type': 'coalesced', 'leader': self.id})
+        for event in history:
+            job.emit(event)
+        return True
+
+    def remove_follower(self, job):
+        """Drop a cancelled follower; stops the work if nobody is left waiting for it."""
+        with self._cond:
+            if job in self.followers:
+                self.followers.remove(job)
+            if self.detached and not self.followers:
+                self.cancel_event.set()
+
+    def detach(self):
+        """The leader's own client cancelled; stops the work unless followers still wait for it."""
+        with self._cond:
+            self.detached = True
+            if not self.followers:
+                self.cancel_event.set()
+            self._cond.notify_all()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    @property
+    def client_status(self):
+        """Status as this job's own client sees it."""
+        return 'cancelled' if self.detached else self.status
+
+    def emit(self, event):
+        with self._cond:
+            event['job'] = self.id
+            self.events.append(event)
+            followers = list(self.followers)
+            self._cond.notify_all()
+        for follower in followers:
+            follower.emit(dict(event))
+
+    def set_status(self, status, result=None):
+        with self._cond:
+            self.status = status
+            self.result = result
+            followers = list(self.followers)
+        for follower in followers:
+            with follower._cond:
+                follower.status = status
+                follower.result = result
+        self.emit({'type': 'status', 'status': status})
+
+    def iter_events(self, start=0):
+        """Yield events from index `start`, blocking until the job finishes."""
+        index = start
+        while True:
+            with self._cond:
+                while index >= len(self.events) and not self.finished and not self.detached:
+                    self._cond.wait(timeout=1.0)
+                pending = self.events[index:]
+                index = len(self.events)
+                done = self.finished or self.detached
+            yield from pending
+            if done and index >= len(self.events):
+                return
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.kind,
+            'status': self.client_status,
+            'priority': self.priority,
+            'coalesced_with': self.coalesced_with,
+            'result': self.result,
+            'events': len(self.events)
+        }
+
+
+class ArchiveService:
+    """Schedules jobs by priority against the shared repository cache."""
+
+    def __init__(self, workers=4, max_repos=8, delta_cache_bytes=DEFAULT_DELTA_CACHE_BYTES, per_repo_limit=2,
+                 default_params=None):
+        self.repositories = RepositoryCache(max_repos, delta_cache_bytes)
+        self.default_params = default_params or {}
+        self.scheduler = JobScheduler(self._run, workers, per_repo_limit)
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _request_key(self, kind, params):
+        store = None
+        if params.get('backend', 'python') == 'python':
+            store = self.repositories.get(params['repo_path'], lambda message: None)
+        return request_key(kind, params, lambda rev: resolve_commit(params['repo_path'], rev, store) if rev else None)
+
+    def submit(self, kind, params, priority=None):
+        job = Job(kind, params, parse_priority(priority), self._request_key(kind, params))
+        with self._lock:
+            self.jobs[job.id] = job
+            self._prune()
+        self.scheduler.submit(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job for its client. The shared work only stops once the
+        leader and every follower coalesced with it have been cancelled.
+        """
+        job = self.get(job_id)
+        if job and not job.finished and not job.detached:
+            if job.coalesced_with:
+                leader = self.get(job.coalesced_with)
+                if leader:
+                    leader.remove_follower(job)
+                job.set_status('cancelled')
+            else:
+                job.detach()
+        return job
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def _run(self, job):
+        if job.cancel_event.is_set():
+            job.set_status('cancelled')
+            return
+        job.set_status('running')
+        log = lambda message: job.emit({'type': 'log', 'message': message})
+        params = dict(self.default_params)
+        params.update(job.params)
+        params.update({
+            'log_callback': log,
+            'progress_callback': lambda value, message: job.emit({'type': 'progress', 'value': value, 'message': message}),
+            'cancel_event': job.cancel_event,
+        })
+        try:
+            if params.get('backend', 'python') == 'python':
+                params['object_store'] = self.repositories.get(params['repo_path'], log)
+            if job.kind == 'preview':
+                result = get_file_list_preview(params)
+                job.set_status('failed' if result.get('error') else 'done', result)
+            else:
+                result = archive_git_history(params)
+                if job.cancel_event.is_set():
+                    job.set_status('cancelled')
+                else:
+                    job.set_status('done' if result else 'failed', result)
+        except Exception as e:
+            log(f"An unexpected error occurred: {e}")
+            job.set_status('failed', {'error': str(e)})
+
+    def shutdown(self):
+        for job in list(self.jobs.values()):
+            job.cancel_event.set()
+        self.scheduler.shutdown(wait=True)
+
+
+def json_default(obj):
+    """Serialise result objects that are not plain JSON (e.g. preview CommitRecords)."""
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def validate_job(body):
+    """Return (kind, params) for a job request body, or raise ValueError."""
+    kind = body.get('type', 'archive')
+    if kind not in JOB_TYPES:
+        raise ValueError(f"Unknown job type '{kind}'")
+    params = {k: v for k, v in (body.get('params') or {}).items() if k not in INTERNAL_PARAMS}
+    required = ['repo_path', 'mode'] + (['output_zip'] if kind == 'archive' else [])
+    missing = [key for key in required if not params.get(key)]
+    if missing:
+        raise ValueError(f"Missing required params: {', '.join(missing)}")
+    return kind, params
+
+
+class ArchiveRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'GitArchiveServer/1.0'
+    protocol_version = 'HTTP/1.0'  # Streams end when the connection closes
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=json_default).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_events(self, job):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        try:
+            for event in job.iter_events():
+                self.wfile.write((json.dumps(event, ensure_ascii=False, default=json_default) + '\n').encode('utf-8'))
+                self.wfile.flush()
+            final = {'type': 'result', 'job': job.id, 'status': job.client_status,
+                     'result': None if job.detached else job.result}
+            self.wfile.write((json.dumps(final, ensure_ascii=False, default=json_default) + '\n').encode('utf-8'))
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client went away; the job keeps running
+
+    def _job_from_path(self):
+        parts = [p for p in self.path.split('?', 1)[0].split('/') if p]
+        if len(parts) >= 2 and parts[0] == 'jobs':
+            return self.service.get(parts[1]), parts[2:]
+        return None, None
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] == '/health':
+            self._send_json(200, {
+                'status': 'ok',
+                'jobs': len(self.service.jobs),
+                'scheduler': self.service.scheduler.stats(),
+                'repositories': self.service.repositories.repos()
+            })
+            return
+        job, rest = self._job_from_path()
+        if job is None:
+            self._send_json(404, {'error': 'Not found'})
+        elif rest == ['events']:
+            self._stream_events(job)
+        else:
+            self._send_json(200, job.to_dict())
+
+    def do_POST(self):
+        if self.path.split('?', 1)[0] != '/jobs':
+            self._send_json(404, {'error': 'Not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            kind, params = validate_job(body)
+            job = self.service.submit(kind, params, body.get('priority'))
+        except (ValueError, AttributeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        if body.get('stream'):
+            self._stream_events(job)
+        else:
+            self._send_json(202, job.to_dict())
+
+    def do_DELETE(self):
+        job, _ = self._job_from_path()
+        if job is None:
+            self._send_json(404, {'error': 'Not found'})
+            return
+        self.service.cancel(job.id)
+        self._send_json(200, job.to_dict())
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service, host='127.0.0.1', port=8765, socket_path=None, quiet=False):
+    """Create an HTTP server on localhost, or on a Unix socket when socket_path is given."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, ArchiveRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ArchiveRequestHandler)
+        server.daemon_threads = True
+    server.service = service
+    server.quiet = quiet
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="git_archive_by_date.py serve",
+        description="Run a local archive service that keeps repositories warm between jobs.",
+        epilog="Created by ekosiswoyo"
+    )
+    parser.add_argument("--host", default='127.0.0.1', help="Address to bind (default: %(default)s).")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: %(default)s).")
+    if hasattr(socketserver, 'UnixStreamServer'):
+        parser.add_argument("--socket", help="Listen on this Unix socket path instead of TCP.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of concurrent jobs (default: %(default)s).")
+    parser.add_argument("--per-repo-limit", type=int, default=2,
+                        help="Maximum concurrent jobs per repository (default: %(default)s).")
+    parser.add_argument("--max-repos", type=int, default=8, help="Repositories kept open (default: %(default)s).")
+    parser.add_argument("--delta-cache-mb", type=int, default=DEFAULT_DELTA_CACHE_BYTES // (1024 * 1024),
+                        help="Delta-base cache size per repository (default: %(default)s).")
+    parser.add_argument("--cache-dir", help="Artifact cache directory shared by all jobs.")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_CACHE_BYTES // (1024 * 1024),
+                        help="Disk budget of the artifact cache (default: %(default)s).")
+    parser.add_argument("-q", "--quiet", action='store_true', help="Do not log HTTP requests.")
+    args = parser.parse_args(argv)
+
+    default_params = {}
+    if args.cache_dir:
+        default_params = {'artifact_cache_dir': args.cache_dir, 'artifact_cache_mb': args.cache_max_mb}
+    service = ArchiveService(args.workers, args.max_repos, args.delta_cache_mb * 1024 * 1024, args.per_repo_limit,
+                             default_params)
+    socket_path = getattr(args, 'socket', None)
+    server = make_server(service, args.host, args.port, socket_path, args.quiet)
+    where = socket_path or f"http://{args.host}:{args.port}"
+    print(f"Git archive service listening on {where} ({args.workers} workers). Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,320 @@
+import os
+import sys
+import json
+import argparse
+import threading
+from datetime import datetime
+
+from git_objects import DEFAULT_DELTA_CACHE_BYTES, open_object_store
+from git_archive_by_date import (SERIES_INDEX_SUFFIX, get_commits_with_files, resolve_commit, run_command,
+                                 write_commit_archive)
+
+# Watch mode: follow one branch and archive every commit that lands on it.
+# The branch ref is polled with os.stat() on its loose ref file and on
+# packed-refs, so an idle poll costs two stat calls and no git process. New
+# commits are walked once, from the last archived commit to the new tip, and
+# appended to a rolling per-commit series:
+#
+#   <base>.<number>-<short sha><ext>   one archive per commit, numbered on from the last run
+#   <base>.series.json                 index of every archive in the series
+#   <base>.changelog.txt               rolling changelog, one entry per commit
+#   <base>.watch.json                  checkpoint: last archived commit and next number
+#
+# The checkpoint is replaced atomically after each batch. A restart resumes
+# from it without rescanning; a batch interrupted before its checkpoint is
+# written again with the same numbers, after its index records and changelog
+# entries are dropped (the checkpoint records the changelog's size).
+
+WATCH_STATE_SUFFIX = '.watch.json'
+WATCH_CHANGELOG_SUFFIX = '.changelog.txt'
+DEFAULT_POLL_SECONDS = 5.0
+
+
+def find_git_dir(repo_path):
+    """Return the repository's git directory, following a `.git` file (worktrees, submodules)."""
+    dot_git = os.path.join(repo_path, '.git')
+    if os.path.isfile(dot_git):
+        with open(dot_git, 'r', encoding='utf-8') as f:
+            value = f.read().strip()
+        if value.startswith('gitdir: '):
+            return os.path.normpath(os.path.join(repo_path, value[8:]))
+    return dot_git
+
+
+class BranchRef:
+    """Cheap poller for one branch tip."""
+
+    def __init__(self, repo_path, branch):
+        self.repo_path = repo_path
+        self.ref = branch if branch.startswith('refs/') else f"refs/heads/{branch}"
+        git_dir = find_git_dir(repo_path)
+        # Worktrees keep their own HEAD but share refs with the common dir
+        common = os.path.join(git_dir, 'commondir')
+        if os.path.isfile(common):
+            with open(common, 'r', encoding='utf-8') as f:
+                git_dir = os.path.normpath(os.path.join(git_dir, f.read().strip()))
+        self.loose_path = os.path.join(git_dir, *self.ref.split('/'))
+        self.packed_path = os.path.join(git_dir, 'packed-refs')
+        self._signature = None
+        self._value = None
+
+    def _stat_signature(self):
+        signature = []
+        for path in (self.loose_path, self.packed_path):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except OSError:
+                signature.append(None)
+        return signature
+
+    def _read_files(self):
+        try:
+            with open(self.loose_path, 'r', encoding='utf-8') as f:
+                value = f.read().strip()
+            if value and not value.startswith('ref: '):
+                return value
+        except OSError:
+            pass
+        try:
+            with open(self.packed_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.startswith('#') or line.startswith('^'):
+                        continue
+                    parts = line.strip().split(' ', 1)
+                    if len(parts) == 2 and parts[1] == self.ref:
+                        return parts[0]
+        except OSError:
+            pass
+        return None
+
+    def read(self):
+        """Return the branch tip SHA, or None if the branch does not exist."""
+        signature = self._stat_signature()
+        if signature == [None, None]:
+            # Neither file exists (e.g. a reftable repository): ask git
+            return run_command(['git', 'rev-parse', '--verify', '--quiet', f"{self.ref}^{{commit}}"], self.repo_path)
+        if signature != self._signature:
+            self._value = self._read_files()
+            self._signature = signature
+        return self._value
+
+
+def load_json(path):
+    """Return a saved checkpoint or index, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_json(path, data):
+    """Write JSON through a temporary file so readers never see half a file."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8', newline='\n') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(temp_path, path)
+
+
+def is_ancestor(repo_path, ancestor, descendant):
+    return run_command(['git', 'merge-base', '--is-ancestor', ancestor, descendant], repo_path) is not None
+
+
+def append_changelog(changelog_path, state, commits, records):
+    """
+    Append one entry per archived commit to the rolling text changelog and
+    return its new size. Anything past the size recorded in the checkpoint
+    was written by an interrupted batch and is cut off first.
+    """
+    from changelog import TextChangelogWriter
+    checkpoint_size = state.get('changelog_bytes')
+    if checkpoint_size is not None and os.path.exists(changelog_path) \
+            and os.path.getsize(changelog_path) > checkpoint_size:
+        with open(changelog_path, 'r+b') as f:
+            f.truncate(checkpoint_size)
+    is_new = not os.path.exists(changelog_path) or not os.path.getsize(changelog_path)
+    writer = TextChangelogWriter(changelog_path, mode='a')
+    try:
+        if is_new:
+            writer.f.write(f"Rolling changelog for {os.path.basename(state['archive_base'])}\n")
+            writer.f.write("="*70 + "\n")
+            writer.f.write(f"Repository: {state['repository']}\n")
+            writer.f.write(f"Branch: {state['branch']}\n")
+            writer.f.write("="*70 + "\n")
+        for commit, record in zip(commits, records):
+            writer.commit(record['number'], commit, [entry['path'] for entry in record['files']])
+    finally:
+        writer.close()
+    return os.path.getsize(changelog_path)
+
+
+def archive_new_commits(params, state, head, store=None, log_callback=print, check_cancel=None):
+    """
+    Archive the commits between the checkpoint and `head` (oldest first),
+    extend the series index and changelog, and advance the checkpoint.
+    Returns the number of commits processed.
+    """
+    repo_path = params['repo_path']
+    base = state['archive_base']
+    last = state['last_commit']
+    if not is_ancestor(repo_path, last, head):
+        # History was rewritten: continue from where the old and new tips meet
+        merge_base = run_command(['git', 'merge-base', last, head], repo_path)
+        if merge_base:
+            log_callback(f"Warning: {state['branch']} was rewritten ({last[:10]} is no longer on it). "
+                         f"Continuing from {merge_base[:10]}.")
+        else:
+            log_callback(f"Warning: {state['branch']} was replaced by unrelated history ({last[:10]} shares "
+                         f"no commit with it). Archiving every commit of the new history.")
+        last = merge_base
+
+    if last:
+        commits = get_commits_with_files(repo_path, 'sha_range', store=store, start_sha=last, end_sha=head)
+    else:
+        # All of head's history: its oldest root commit plus every commit that root cannot reach
+        root = (run_command(['git', 'rev-list', '--max-parents=0', head], repo_path) or head).split()[-1]
+        commits = (get_commits_with_files(repo_path, 'sha_range', store=store, start_sha=root, end_sha=head) +
+                   get_commits_with_files(repo_path, 'commit_sha', store=store, commit_sha=root))
+    commits.reverse()
+    log_callback(f"{len(commits)} new commit(s) on {state['branch']} ({(last or '')[:7]}..{head[:7]}).")
+
+    records = []
+    for number, commit in enumerate(commits, state['next_number']):
+        record = write_commit_archive(repo_path, commit, number, base, state['format'], store,
+                                      params.get('reproducible', True), log_callback, check_cancel)
+        if record['archive']:
+            log_callback(f"  [{number}] {commit['hash'][:10]} {record['archive']} ({len(record['files'])} files)")
+        else:
+            log_callback(f"  [{number}] {commit['hash'][:10]} has no files to archive; no archive written.")
+        records.append(record)
+
+    index_path = f"{base}{SERIES_INDEX_SUFFIX}"
+    index = load_json(index_path) or {
+        'repository': state['repository'],
+        'mode': 'watch',
+        'range': {'branch': state['branch']},
+        'format': state['format'],
+        'commits': []
+    }
+    # Drop records left by a batch that was interrupted before its checkpoint
+    index['commits'] = [r for r in index['commits'] if r['number'] < state['next_number']] + records
+    index['total_commits'] = len(index['commits'])
+    save_json(index_path, index)
+    if commits:
+        state['changelog_bytes'] = append_changelog(f"{base}{WATCH_CHANGELOG_SUFFIX}", state, commits, records)
+
+    state['last_commit'] = head
+    state['next_number'] += len(commits)
+    state['updated'] = datetime.now().isoformat(timespec='seconds')
+    save_json(params['state_path'], state)
+    return len(commits)
+
+
+def watch_branch(params):
+    """
+    Follow params['branch'] and archive new commits until cancelled (or
+    after one pass with params['once']). Accepts the archive_git_history()
+    callbacks: log_callback, and cancel_event to stop between polls.
+    """
+    log_callback = params.get('log_callback', print)
+    cancel_event = params.get('cancel_event') or threading.Event()
+    repo_path = params['repo_path']
+    # Absolute, so a watcher restarted from another directory writes to the same series
+    base = os.path.abspath(params['output_zip'])
+    state_path = params.setdefault('state_path', f"{base}{WATCH_STATE_SUFFIX}")
+
+    if not os.path.isdir(repo_path):
+        log_callback(f"Error: Repository path '{repo_path}' does not exist.")
+        return None
+
+    # The series and its checkpoint may go to a directory that does not exist yet
+    for directory in {os.path.dirname(base), os.path.dirname(os.path.abspath(state_path))}:
+        os.makedirs(directory, exist_ok=True)
+
+    def check_cancel():
+        if cancel_event.is_set():
+            raise InterruptedError("Watch cancelled")
+
+    ref = BranchRef(repo_path, params['branch'])
+    state = load_json(state_path)
+    if state:
+        if state['branch'] != params['branch']:
+            log_callback(f"Error: {state_path} follows branch '{state['branch']}', not '{params['branch']}'.")
+            return None
+        log_callback(f"Resuming from {state['last_commit'][:10]} (next archive number {state['next_number']}).")
+    else:
+        head = ref.read()
+        if not head:
+            log_callback(f"Error: Branch '{params['branch']}' not found.")
+            return None
+        start = params.get('start_sha')
+        state = {
+            'repository': os.path.abspath(repo_path),
+            'branch': params['branch'],
+            'archive_base': base,
+            'format': params.get('archive_format', 'zip'),
+            # Without a start commit only commits that land from now on are archived
+            'last_commit': (resolve_commit(repo_path, start) or start) if start else head,
+            'next_number': 1,
+            'changelog_bytes': 0
+        }
+        save_json(state_path, state)
+        log_callback(f"Watching {params['branch']} from {state['last_commit'][:10]}; checkpoint: {state_path}")
+
+    store = None
+    if params.get('backend') == 'python':
+        store = open_object_store(repo_path, log_callback,
+                                  params.get('delta_cache_mb', DEFAULT_DELTA_CACHE_BYTES // (1024 * 1024)) * 1024 * 1024)
+    interval = params.get('interval', DEFAULT_POLL_SECONDS)
+    total = 0
+    try:
+        while not cancel_event.is_set():
+            head = ref.read()
+            if head and head != state['last_commit']:
+                if store:
+                    store.refresh()
+                total += archive_new_commits(params, state, head, store, log_callback, check_cancel)
+            if params.get('once') or cancel_event.wait(interval):
+                break
+    except InterruptedError:
+        log_callback("Watch cancelled; the last checkpoint is kept.")
+    finally:
+        if store:
+            store.close()
+    return {'state_path': state_path, 'last_commit': state['last_commit'], 'commits': total}
+
+
+def main(argv=None):
+    from archive_writer import ARCHIVE_EXTENSIONS
+    parser = argparse.ArgumentParser(
+        prog="git_archive_by_date.py watch",
+        description="Follow a branch and append an archive for every new commit to a rolling series.",
+        epilog="Created by ekosiswoyo"
+    )
+    parser.add_argument("repo_path", help="Absolute path to the local Git repository.")
+    parser.add_argument("-o", "--output-zip", required=True, help="Base name of the archive series (e.g., 'my-archive').")
+    parser.add_argument("-b", "--branch", required=True, help="The branch to follow.")
+    parser.add_argument("--start-sha", help="Also archive the commits after this one on the first run\n"
+                                            "(default: only commits that land after the watch starts).")
+    parser.add_argument("--format", dest='archive_format', choices=list(ARCHIVE_EXTENSIONS), default='zip',
+                        help="Archive format of the series (default: %(default)s).")
+    parser.add_argument("--interval", type=float, default=DEFAULT_POLL_SECONDS,
+                        help="Seconds between polls of the branch ref (default: %(default)s).")
+    parser.add_argument("--state", dest='state_path', help="Checkpoint path (default: <name>.watch.json).")
+    parser.add_argument("--once", action='store_true', help="Archive what is new since the checkpoint and exit.")
+    parser.add_argument("--backend", choices=['cli', 'python'], default='cli',
+                        help="How git objects are read (default: %(default)s).")
+    parser.add_argument("--no-reproducible", dest='reproducible', action='store_false',
+                        help="Stamp archive entries with the current time instead of the commit time.")
+    args = parser.parse_args(argv)
+
+    params = dict((key, value) for key, value in vars(args).items() if value is not None)
+    print(f"Watching '{args.branch}' every {args.interval:g}s. Press Ctrl+C to stop.")
+    try:
+        watch_branch(params)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,366 @@
+import io
+import os
+import gzip
+import json
+import time
+import hashlib
+import tarfile
+import zipfile
+
+# Writes archive entries directly from memory/streams instead of staging files
+# in a temporary directory and calling shutil.make_archive. Every entry is
+# hashed (SHA-256 and git blob SHA-1) in the same pass that writes it.
+
+ARCHIVE_EXTENSIONS = {'zip': '.zip', 'tar': '.tar', 'gztar': '.tar.gz'}
+CHUNK_SIZE = 1024 * 1024
+
+# Fixed settings so identical inputs give byte-identical archives regardless
+# of the host: compression levels, zip "made by" system and entry metadata.
+ZIP_COMPRESS_LEVEL = 6
+GZIP_COMPRESS_LEVEL = 9
+ZIP_CREATE_SYSTEM = 3  # Unix, so the mode bits in external_attr are honoured
+ZIP_MIN_TIMESTAMP = 315532800  # 1980-01-01, the earliest date a zip entry can hold
+FILE_MODE = 0o644
+EXECUTABLE_MODE = 0o755
+DIR_MODE = 0o755
+SYMLINK_MODE = 0o777
+
+VOLUME_INDEX_SUFFIX = '.volumes.json'
+# A volume this full is closed at the next directory change rather than
+# letting that directory straddle two volumes
+VOLUME_DIRECTORY_BREAK = 0.8
+
+
+def strip_archive_extension(path):
+    """Remove a known archive extension from an output path."""
+    for ext in ['.zip', '.tar', '.tar.gz', '.gz']:
+        if path.lower().endswith(ext):
+            return path[:-len(ext)]
+    return path
+
+
+def iter_chunks(data):
+    """Yield a bytes object (or a readable file object) in CHUNK_SIZE pieces."""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        view = memoryview(data)
+        for start in range(0, len(view), CHUNK_SIZE):
+            yield view[start:start + CHUNK_SIZE]
+    else:
+        while True:
+            chunk = data.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+class EntryDigest:
+    """Incremental SHA-256 and git blob OID of one archive entry."""
+
+    def __init__(self, size):
+        self.size = size
+        self.sha256 = hashlib.sha256()
+        self.git_oid = hashlib.sha1(f"blob {size}\0".encode('ascii'))
+        self.bytes_seen = 0
+
+    def update(self, chunk):
+        self.sha256.update(chunk)
+        self.git_oid.update(chunk)
+        self.bytes_seen += len(chunk)
+
+
+class _HashingReader(io.RawIOBase):
+    """File-like view over a chunk iterator that feeds an EntryDigest as it is read."""
+
+    def __init__(self, chunks, digest):
+        self._chunks = iter(chunks)
+        self._digest = digest
+        self._current = b''
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        out = []
+        while size != 0:
+            if self._pos >= len(self._current):
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._digest.update(chunk)
+                self._current, self._pos = chunk, 0
+            available = len(self._current) - self._pos
+            take = available if size < 0 else min(size, available)
+            out.append(self._current[self._pos:self._pos + take])
+            self._pos += take
+            if size > 0:
+                size -= take
+        return b''.join(out)
+
+
+class ArchiveWriter:
+    """
+    Streams files into a zip, tar or gztar archive. The archive is written to a
+    temporary name next to the destination and only renamed into place by
+    close(); abort() discards it.
+
+    With `reproducible`, every entry (and the gzip header) carries `mtime`,
+    zip timestamps are taken in UTC rather than local time, and owners are
+    left empty, so the output depends only on the entries added and their order.
+    """
+
+    def __init__(self, path, archive_format='zip', mtime=None, reproducible=False):
+        self.path = path
+        self.archive_format = archive_format
+        self.mtime = int(mtime if mtime is not None else time.time())
+        self.reproducible = reproducible
+        self._tmp_path = f"{path}.partial"
+        self._dirs = set()
+        self._zip = self._tar = self._gzip = self._raw = None
+        if archive_format == 'zip':
+            self._zip = zipfile.ZipFile(self._tmp_path, 'w', compression=zipfile.ZIP_DEFLATED,
+                                        compresslevel=ZIP_COMPRESS_LEVEL)
+        elif archive_format in ('tar', 'gztar'):
+            fileobj = self._raw = open(self._tmp_path, 'wb')
+            if archive_format == 'gztar':
+                # tarfile's own gzip stream embeds the output name and the current time
+                fileobj = self._gzip = gzip.GzipFile(filename='', mode='wb', fileobj=self._raw,
+                                                     compresslevel=GZIP_COMPRESS_LEVEL,
+                                                     mtime=self.mtime if reproducible else None)
+            self._tar = tarfile.open(fileobj=fileobj, mode='w', format=tarfile.PAX_FORMAT)
+        else:
+            raise ValueError(f"Unsupported archive format: {archive_format}")
+
+    def _date_time(self):
+        if self.reproducible:
+            return time.gmtime(max(self.mtime, ZIP_MIN_TIMESTAMP))[:6]
+        return time.localtime(self.mtime)[:6]
+
+    def _zip_info(self, name, mode):
+        info = zipfile.ZipInfo(name, self._date_time())
+        info.create_system = ZIP_CREATE_SYSTEM
+        info.external_attr = mode << 16
+        return info
+
+    def _tar_info(self, name, mode):
+        info = tarfile.TarInfo(name)
+        info.mode = mode
+        info.mtime = self.mtime
+        info.uid = info.gid = 0
+        info.uname = info.gname = ''
+        return info
+
+    def _add_parent_dirs(self, arcname):
+        parts = arcname.split('/')[:-1]
+        for i in range(1, len(parts) + 1):
+            dir_name = '/'.join(parts[:i])
+            if dir_name in self._dirs:
+                continue
+            self._dirs.add(dir_name)
+            if self._zip:
+                info = self._zip_info(dir_name + '/', 0o40000 | DIR_MODE)
+                info.external_attr |= 0x10
+                self._zip.writestr(info, b'')
+            else:
+                info = self._tar_info(dir_name, DIR_MODE)
+                info.type = tarfile.DIRTYPE
+                self._tar.addfile(info)
+
+    def add_file(self, arcname, data, size=None, mode=FILE_MODE, compress=True):
+        """
+        Add one file from bytes or a readable file object and return its
+        EntryDigest. `size` is required when data is a file object. With
+        `compress` False a zip entry is stored as-is; tar entries are never
+        compressed individually.
+        """
+        if size is None:
+            size = len(data)
+        self._add_parent_dirs(arcname)
+        digest = EntryDigest(size)
+        if self._zip:
+            info = self._zip_info(arcname, 0o100000 | mode)
+            info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+            info._compresslevel = ZIP_COMPRESS_LEVEL if compress else None
+            info.file_size = size
+            with self._zip.open(info, 'w', force_zip64=size > 0x7fffffff) as dest:
+                for chunk in iter_chunks(data):
+                    digest.update(chunk)
+                    dest.write(chunk)
+        else:
+            info = self._tar_info(arcname, mode)
+            info.size = size
+            self._tar.addfile(info, _HashingReader(iter_chunks(data), digest))
+        if digest.bytes_seen != size:
+            raise IOError(f"Size mismatch while archiving '{arcname}'")
+        return digest
+
+    def add_symlink(self, arcname, target):
+        """
+        Add a symbolic link. `target` is the link text as bytes (a git symlink
+        blob); the returned EntryDigest covers those bytes.
+        """
+        self._add_parent_dirs(arcname)
+        digest = EntryDigest(len(target))
+        digest.update(target)
+        if self._zip:
+            # Unix unzip restores members with S_IFLNK as links to their content
+            info = self._zip_info(arcname, 0o120000 | SYMLINK_MODE)
+            info.compress_type = zipfile.ZIP_STORED
+            self._zip.writestr(info, target)
+        else:
+            info = self._tar_info(arcname, SYMLINK_MODE)
+            info.type = tarfile.SYMTYPE
+            info.linkname = target.decode('utf-8', errors='surrogateescape')
+            self._tar.addfile(info)
+        return digest
+
+    @property
+    def bytes_written(self):
+        """Bytes flushed to the output file so far (compressed, excluding the trailer)."""
+        if self._zip:
+            return self._zip.fp.tell()
+        if self._gzip:
+            # Push out what zlib is holding back so the file position is exact
+            self._gzip.flush()
+        return self._raw.tell()
+
+    def _close_streams(self):
+        for stream in (self._zip, self._tar, self._gzip, self._raw):
+            if stream:
+                stream.close()
+
+    def close(self):
+        """Finish the archive and move it to its final path."""
+        self._close_streams()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """Discard a partially written archive."""
+        try:
+            self._close_streams()
+        except Exception:
+            pass
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class VolumeWriter:
+    """
+    Streams entries into a series of archives (`<base>.part001.zip`, ...) of at
+    most `max_bytes` each, with the same interface as ArchiveWriter. Every
+    volume is a complete archive with its own directory entries, so it can be
+    extracted on its own. close() writes `<base>.volumes.json`, mapping each
+    path to its volume. A single entry larger than max_bytes gets a volume of
+    its own and is the only way a volume can exceed the cap.
+    """
+
+    def __init__(self, base_path, archive_format='zip', max_bytes=None, mtime=None, reproducible=False):
+        if archive_format not in ARCHIVE_EXTENSIONS:
+            raise ValueError(f"Unsupported archive format: {archive_format}")
+        if not max_bytes or max_bytes <= 0:
+            raise ValueError("max_bytes must be a positive number of bytes")
+        self.base_path = base_path
+        self.archive_format = archive_format
+        self.max_bytes = max_bytes
+        self.mtime = mtime
+        self.reproducible = reproducible
+        self.path = f"{base_path}{VOLUME_INDEX_SUFFIX}"
+        self.volumes = []
+        self.paths = {}
+        self.oversized = []
+        self._writer = None
+        self._entries = 0
+        self._trailer = 0
+        self._last_dir = None
+
+    def _volume_path(self, number):
+        return f"{self.base_path}.part{number:03d}{ARCHIVE_EXTENSIONS[self.archive_format]}"
+
+    def _entry_estimate(self, arcname, size):
+        # Header and name, plus deflate's worst-case growth on incompressible data
+        return size + size // 1000 + 2 * len(arcname.encode('utf-8', 'surrogateescape')) + 1024
+
+    def _trailer_estimate(self, arcname):
+        if self.archive_format == 'zip':
+            return 46 + len(arcname.encode('utf-8', 'surrogateescape'))  # Central directory record
+        return 0
+
+    def _start_volume(self):
+        path = self._volume_path(len(self.volumes) + 1)
+        self._writer = ArchiveWriter(path, self.archive_format, mtime=self.mtime, reproducible=self.reproducible)
+        self._entries = 0
+        # End-of-archive record (zip) or end blocks and record padding (tar)
+        self._trailer = 22 if self.archive_format == 'zip' else tarfile.RECORDSIZE
+        self.mtime = self._writer.mtime  # All volumes share one timestamp
+        self.volumes.append({'name': os.path.basename(path), 'path': path, 'entries': 0, 'size': None})
+
+    def _finish_volume(self):
+        self._writer.close()
+        volume = self.volumes[-1]
+        volume['entries'] = self._entries
+        volume['size'] = os.path.getsize(volume['path'])
+        self._writer = None
+
+    def _before_entry(self, arcname, size):
+        dir_name = arcname.rpartition('/')[0]
+        if self._writer and self._entries:
+            written = self._writer.bytes_written
+            projected = written + self._trailer + self._entry_estimate(arcname, size)
+            directory_break = dir_name != self._last_dir and written > self.max_bytes * VOLUME_DIRECTORY_BREAK
+            if projected > self.max_bytes or directory_break:
+                self._finish_volume()
+        if self._writer is None:
+            self._start_volume()
+        if self._entry_estimate(arcname, size) > self.max_bytes:
+            self.oversized.append(arcname)
+        self._last_dir = dir_name
+        self._trailer += self._trailer_estimate(arcname)
+
+    def _after_entry(self, arcname):
+        self._entries += 1
+        self.paths[arcname] = self.volumes[-1]['name']
+
+    def add_file(self, arcname, data, size=None, mode=FILE_MODE, compress=True):
+        """Add one file; see ArchiveWriter.add_file()."""
+        self._before_entry(arcname, len(data) if size is None else size)
+        digest = self._writer.add_file(arcname, data, size, mode, compress)
+        self._after_entry(arcname)
+        return digest
+
+    def add_symlink(self, arcname, target):
+        """Add a symbolic link; see ArchiveWriter.add_symlink()."""
+        self._before_entry(arcname, len(target))
+        digest = self._writer.add_symlink(arcname, target)
+        self._after_entry(arcname)
+        return digest
+
+    def close(self):
+        """Finish the last volume and write the path-to-volume index."""
+        if self._writer:
+            self._finish_volume()
+        index = {
+            'format': self.archive_format,
+            'max_bytes': self.max_bytes,
+            'volumes': [dict((k, v) for k, v in volume.items() if k != 'path') for volume in self.volumes],
+            'paths': self.paths
+        }
+        tmp_path = f"{self.path}.partial"
+        with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def abort(self):
+        """Discard the volume being written and any already finished."""
+        if self._writer:
+            self._writer.abort()
+            self._writer = None
+        for volume in self.volumes:
+            if os.path.exists(volume['path']):
+                os.remove(volume['path'])
+
+
+def load_volume_index(path):
+    """Return the volume archive paths listed in a `.volumes.json` index."""
+    with open(path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    return [os.path.join(os.path.dirname(path), volume['name']) for volume in index['volumes']]
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+# Result-level cache of finished exports. Archiving a resolved range is
+# deterministic, so the archive, changelogs and manifest produced for one
+# request can be handed out again by hard link (or copy) instead of being
+# rebuilt. Outputs are copied into the cache, never linked: the user's files
+# may be rewritten by a later export to the same path. Entries are evicted
+# least-recently-used once the cache exceeds its disk budget.
+
+DEFAULT_CACHE_BYTES = 1024 * 1024 * 1024
+META_FILE = 'entry.json'
+
+
+def artifact_key(repo_path, end_oid, changed_paths, archive_format, extra=()):
+    """
+    Key an export by repository identity, resolved end commit, a hash of the
+    changed-path set and the output format. `extra` carries anything else the
+    output depends on (resolved range bounds, changelog formats, range text).
+    """
+    paths_hash = hashlib.sha256('\n'.join(changed_paths).encode('utf-8', 'surrogateescape')).hexdigest()
+    identity = os.path.realpath(os.path.join(repo_path, '.git'))
+    material = json.dumps([identity, end_oid, paths_hash, archive_format, list(extra)], ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8', 'surrogateescape')).hexdigest()
+
+
+def link_or_copy(src, dst):
+    """Hard-link src to dst, falling back to a copy across filesystems."""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+        return 'link'
+    except OSError:
+        shutil.copyfile(src, dst)
+        return 'copy'
+
+
+def _copy_renamed(src, dst, old_name, new_name):
+    """Copy a text output, replacing the archive name on its first (header) line."""
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        first = fin.readline()
+        fout.write(first.replace(old_name.encode('utf-8'), new_name.encode('utf-8'), 1))
+        shutil.copyfileobj(fin, fout)
+
+
+class ArtifactCache:
+    """
+    Directory-backed cache. Each entry is a sub-directory named by its key,
+    holding the output files and an entry.json with their roles and sizes.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _read_meta(self, key):
+        try:
+            with open(os.path.join(self._entry_dir(key), META_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, entry_dir, meta):
+        tmp = os.path.join(entry_dir, META_FILE + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(entry_dir, META_FILE))
+
+    def fetch(self, key, archive_name_base, archive_ext):
+        """
+        Materialise a cached export at archive_name_base. Returns a dictionary
+        of the written paths plus the stored `info`, or None on a miss.
+        """
+        with self._lock:
+            meta = self._read_meta(key)
+            if not meta:
+                return None
+            entry_dir = self._entry_dir(key)
+            archive_src = os.path.join(entry_dir, meta['archive'])
+            if not os.path.exists(archive_src) or os.path.getsize(archive_src) != meta['archive_size']:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                return None
+
+            old_name = meta['archive']
+            new_name = f"{os.path.basename(archive_name_base)}{archive_ext}"
+            written = {'changelogs': []}
+            for role, name in meta['files']:
+                dst = f"{archive_name_base}{name[len(meta['base']):]}"
+                src = os.path.join(entry_dir, name)
+                if role in ('changelog', 'manifest') and old_name != new_name:
+                    _copy_renamed(src, dst, old_name, new_name)
+                else:
+                    link_or_copy(src, dst)
+                if role == 'changelog':
+                    written['changelogs'].append(dst)
+                else:
+                    written[role] = dst
+
+            written['info'] = meta.get('info', {})
+            meta['last_used'] = time.time()
+            self._write_meta(entry_dir, meta)
+            return written
+
+    def store(self, key, archive_name_base, archive_path, manifest_path, changelog_paths, info=None):
+        """
+        Add finished outputs (all named `<archive_name_base><suffix>`) to the
+        cache, then evict down to the size budget. `info` is returned by fetch().
+        """
+        base = os.path.basename(archive_name_base)
+        files = [('archive', archive_path), ('manifest', manifest_path)] + [('changelog', p) for p in changelog_paths]
+
+        with self._lock:
+            entry_dir = self._entry_dir(key)
+            if os.path.exists(os.path.join(entry_dir, META_FILE)):
+                return
+            tmp_dir = f"{entry_dir}.tmp-{os.getpid()}-{threading.get_ident()}"
+            os.makedirs(tmp_dir, exist_ok=True)
+            try:
+                meta_files = []
+                total = 0
+                for role, path in files:
+                    name = os.path.basename(path)
+                    shutil.copyfile(path, os.path.join(tmp_dir, name))
+                    meta_files.append((role, name))
+                    total += os.path.getsize(path)
+                meta = {
+                    'base': base,
+                    'archive': os.path.basename(archive_path),
+                    'archive_size': os.path.getsize(archive_path),
+                    'files': meta_files,
+                    'info': info or {},
+                    'size': total,
+                    'created': time.time(),
+                    'last_used': time.time()
+                }
+                self._write_meta(tmp_dir, meta)
+                os.replace(tmp_dir, entry_dir)
+            except OSError:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                if os.path.exists(os.path.join(entry_dir, META_FILE)):
+                    return  # Another process stored the same export first
+                raise
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for key in os.listdir(self.cache_dir):
+            meta = self._read_meta(key)
+            if meta is None:
+                continue
+            entries.append((meta['last_used'], key, meta['size']))
+            total += meta['size']
+        entries.sort()
+        # Never evict the newest entry, even if it alone exceeds the budget
+        while total > self.max_bytes and len(entries) > 1:
+            _, key, size = entries.pop(0)
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+
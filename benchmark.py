@@ -0,0 +1,158 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+# Benchmarks for the archive tool. Run `python benchmark.py <name> --help`
+# for the options of each benchmark.
+#
+#   memory   Memory held by a large commit range: one dict per commit with a
+#            list of path strings versus CommitRecords with a shared PathTable.
+#   spawns   git processes started by CLI-backend exports of synthetic
+#            repositories of growing size, with and without the long-lived
+#            git_batch processes: a single archive, --per-commit archives and
+#            an archive with --patches commit.
+
+
+def synthetic_commits(count, files_per_commit, distinct_paths):
+    """
+    Yield (hash, author, email, date, subject, paths) tuples shaped like
+    parsed `git log` output. Every string is built fresh, as parsing would.
+    """
+    authors = 50
+    for i in range(count):
+        paths = [f"src/module{(i * 7 + j) % distinct_paths // 100}/file{(i * 7 + j) % distinct_paths}.py"
+                 for j in range(files_per_commit)]
+        yield (f"{i:040x}", f"Author {i % authors}", f"author{i % authors}@example.com",
+               f"2024-01-{i % 28 + 1:02d} 12:00:00 +0700", f"Commit number {i}", paths)
+
+
+def measure(build):
+    """Return (seconds, bytes still allocated, peak bytes) for build()."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, current, peak
+
+
+def memory_main(argv):
+    from commit_records import CommitRecord, PathTable
+
+    parser = argparse.ArgumentParser(prog="benchmark.py memory",
+                                     description="Compare memory of dict commits and CommitRecords.")
+    parser.add_argument("--commits", type=int, default=200000, help="Commits in the range (default: %(default)s).")
+    parser.add_argument("--files", type=int, default=8, help="Changed files per commit (default: %(default)s).")
+    parser.add_argument("--paths", type=int, default=20000, help="Distinct paths in the repository (default: %(default)s).")
+    args = parser.parse_args(argv)
+
+    def build_dicts():
+        commits = []
+        for hexsha, name, email, date, subject, paths in synthetic_commits(args.commits, args.files, args.paths):
+            commits.append({'hash': hexsha, 'author_name': name, 'author_email': email, 'date': date,
+                            'message': subject, 'files': paths, 'is_merge': False})
+        return commits
+
+    def build_records():
+        table = PathTable()
+        commits = []
+        for hexsha, name, email, date, subject, paths in synthetic_commits(args.commits, args.files, args.paths):
+            record = CommitRecord(hexsha, name, email, date, subject)
+            record.set_files(paths, table)
+            commits.append(record)
+        return commits, table
+
+    print(f"{args.commits} commits x {args.files} files, {args.paths} distinct paths")
+    results = {}
+    for label, build in [('dict', build_dicts), ('CommitRecord', build_records)]:
+        elapsed, current, peak = measure(build)
+        results[label] = current
+        print(f"  {label:<13} {current / 1024 / 1024:8.1f} MiB held  {peak / 1024 / 1024:8.1f} MiB peak  {elapsed:6.2f} s")
+    print(f"  reduction     {results['dict'] / max(results['CommitRecord'], 1):8.1f}x")
+
+
+def make_repository(path, commits, files):
+    """Create a repository of `commits` commits, each changing two of `files` files, via fast-import."""
+    subprocess.run(['git', 'init', '-q', path], check=True)
+    stream = []
+    start = 1704067200  # 2024-01-01
+    for i in range(commits):
+        when = f"{start + i * 600} +0000"
+        stream.append(f"commit refs/heads/main\nauthor Bench <bench@example.com> {when}\n"
+                      f"committer Bench <bench@example.com> {when}\ndata {len(f'change {i}')}\nchange {i}\n")
+        for j in sorted({i % files, (i * 7 + 3) % files}):
+            content = f"file {j} revision {i}\n"
+            stream.append(f"M 100644 inline dir{j % 10}/file{j}.txt\ndata {len(content)}\n{content}")
+        stream.append("\n")
+    subprocess.run(['git', 'fast-import', '--quiet'], cwd=path, input=''.join(stream).encode('utf-8'), check=True)
+    subprocess.run(['git', 'reset', '-q', '--hard', 'main'], cwd=path, check=True)
+
+
+class CountingPopen(subprocess.Popen):
+    """subprocess.Popen that counts every process it starts."""
+    started = 0
+
+    def __init__(self, *args, **kwargs):
+        CountingPopen.started += 1
+        super().__init__(*args, **kwargs)
+
+
+def spawns_main(argv):
+    import git_batch
+    from git_archive_by_date import archive_git_history
+
+    parser = argparse.ArgumentParser(prog="benchmark.py spawns",
+                                     description="Count git processes per export with and without process reuse.")
+    parser.add_argument("--sizes", default="50,200,800",
+                        help="Comma-separated commit counts; each repository has as many files (default: %(default)s).")
+    args = parser.parse_args(argv)
+    exports = [('archive', {}), ('per-commit', {'per_commit': True}), ('patches', {'patches': 'commit'})]
+
+    workdir = tempfile.mkdtemp(prefix='git-archive-bench-')
+    original_popen = subprocess.Popen
+    subprocess.Popen = CountingPopen
+    try:
+        print(f"{'commits':>8} {'files':>6} {'export':>10} {'archived':>9} {'reuse':>6} {'spawns':>7} {'seconds':>8}")
+        for size in [int(value) for value in args.sizes.split(',')]:
+            repo = os.path.join(workdir, f"repo{size}")
+            make_repository(repo, size, size)
+            for export, options in exports:
+                for reuse in (False, True):
+                    git_batch.ENABLED = reuse
+                    git_batch.close_all()
+                    CountingPopen.started = 0
+                    started = time.perf_counter()
+                    # Per-blob extraction and a changelog over every commit: one query per file and per commit
+                    result = archive_git_history(dict({
+                        'repo_path': repo, 'output_zip': os.path.join(workdir, f"{export}{size}-{int(reuse)}", 'out'),
+                        'mode': 'date', 'branch': 'main', 'start_date': '2023-12-31', 'end_date': '2030-01-01',
+                        'git_archive': False, 'log_callback': lambda message: None}, **options))
+                    elapsed = time.perf_counter() - started
+                    archived = result.get('total_files', 0) if result else 0
+                    print(f"{size:>8} {size:>6} {export:>10} {archived:>9} {'yes' if reuse else 'no':>6} "
+                          f"{CountingPopen.started:>7} {elapsed:>8.2f}")
+    finally:
+        subprocess.Popen = original_popen
+        git_batch.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+BENCHMARKS = {'memory': memory_main, 'spawns': spawns_main}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"usage: python benchmark.py {{{','.join(BENCHMARKS)}}} [options]")
+        sys.exit(2)
+    BENCHMARKS[sys.argv[1]](sys.argv[2:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import os
+import csv
+import json
+
+# Streaming changelog renderers. Commits are fed one at a time, so the
+# changelog never needs the whole commit range in memory, and several output
+# formats can be produced in the same pass over the commit stream.
+
+CHANGELOG_FORMATS = ['txt', 'md', 'json', 'csv']
+
+
+class ChangelogWriter:
+    """Base class: subclasses render a header, one block per commit and a summary."""
+    extension = None
+    newline = ''
+
+    def __init__(self, path, mode='w'):
+        self.path = path
+        # A new changelog replaces the old file instead of truncating it, so
+        # hard links to the previous one (e.g. in the artifact cache) keep their contents
+        self._tmp_path = f"{path}.partial" if mode == 'w' else None
+        self.f = open(self._tmp_path or path, mode, encoding='utf-8', newline=self.newline)
+
+    def begin(self, info):
+        pass
+
+    def commit(self, index, commit, files):
+        pass
+
+    def end(self, summary):
+        pass
+
+    def close(self):
+        self.f.close()
+        if self._tmp_path:
+            os.replace(self._tmp_path, self.path)
+
+
+class TextChangelogWriter(ChangelogWriter):
+    """The classic `.txt` changelog."""
+    extension = '.txt'
+    newline = None  # Platform line endings, as before
+
+    def begin(self, info):
+        f = self.f
+        f.write(f"Changelog for {info['archive_name']}\n")
+        f.write("="*70 + "\n")
+        f.write(f"Repository: {info['repository']}\n")
+        f.write(info['range_info'] + "\n")
+        f.write(f"Total Files Archived: {info['total_files']}\n")
+        f.write("="*70 + "\n\n")
+        if info.get('large_files'):
+            f.write(f"Large Files ({len(info['large_files'])}):\n")
+            for record in info['large_files']:
+                f.write(f"  - {record['path']}: {record['note']}\n")
+            f.write("="*70 + "\n\n")
+        if info['commit_count']:
+            f.write(f"Commits with Changed Files ({info['commit_count']}):\n")
+            f.write("="*70 + "\n")
+
+    def commit(self, index, commit, files):
+        f = self.f
+        is_merge = commit.get('is_merge', False)
+        commit_type = " [MERGE]" if is_merge else ""
+        f.write(f"\n[{index}] Commit: {commit['hash'][:10]}{commit_type}\n")
+        f.write(f"    Author: {commit['author_name']} <{commit['author_email']}>\n")
+        f.write(f"    Date: {commit['date']}\n")
+        f.write(f"    Message: {commit['message']}\n")
+
+        if is_merge:
+            f.write(f"    Type: Merge Commit\n")
+            if not files:
+                f.write(f"    Note: Merge commits may not show direct file changes\n")
+
+        f.write(f"    Files Changed ({len(files)}):\n")
+
+        if files:
+            for file_path in sorted(files):
+                f.write(f"      - {file_path}\n")
+        else:
+            if is_merge:
+                f.write(f"      (Merge commit - files may have been changed in merged branches)\n")
+            else:
+                f.write(f"      (No files from this commit were archived)\n")
+        f.write("-" * 60 + "\n")
+
+    def end(self, summary):
+        f = self.f
+        if summary['total_commits']:
+            f.write(f"\nSummary:\n")
+            f.write(f"- Total commits: {summary['total_commits']}\n")
+            f.write(f"- Total unique files archived: {summary['total_files']}\n")
+            f.write(f"- Total file changes across all commits: {summary['total_commit_files']}\n")
+        else:
+            # Fallback for when no commit info is available
+            f.write(f"Archived Files ({summary['total_files']}):\n")
+            f.write("-" * 50 + "\n")
+            for file_path in sorted(summary['archived_files']):
+                f.write(f"{file_path}\n")
+
+
+class MarkdownChangelogWriter(ChangelogWriter):
+    extension = '.md'
+
+    def begin(self, info):
+        f = self.f
+        f.write(f"# Changelog for {info['archive_name']}\n\n")
+        f.write(f"- **Repository:** `{info['repository']}`\n")
+        for line in info['range_info'].splitlines():
+            key, _, value = line.partition(': ')
+            f.write(f"- **{key}:** {value}\n")
+        f.write(f"- **Total Files Archived:** {info['total_files']}\n\n")
+        if info.get('large_files'):
+            f.write(f"## Large Files ({len(info['large_files'])})\n\n")
+            for record in info['large_files']:
+                f.write(f"- `{record['path']}`: {record['note']}\n")
+            f.write("\n")
+        if info['commit_count']:
+            f.write(f"## Commits with Changed Files ({info['commit_count']})\n")
+
+    def commit(self, index, commit, files):
+        f = self.f
+        merge = " (merge)" if commit.get('is_merge', False) else ""
+        f.write(f"\n### {index}. `{commit['hash'][:10]}`{merge} {commit['message']}\n\n")
+        f.write(f"- **Author:** {commit['author_name']} <{commit['author_email']}>\n")
+        f.write(f"- **Date:** {commit['date']}\n")
+        f.write(f"- **Files Changed ({len(files)}):**\n")
+        for file_path in sorted(files):
+            f.write(f"  - `{file_path}`\n")
+
+    def end(self, summary):
+        f = self.f
+        if summary['total_commits']:
+            f.write(f"\n## Summary\n\n")
+            f.write(f"- Total commits: {summary['total_commits']}\n")
+            f.write(f"- Total unique files archived: {summary['total_files']}\n")
+            f.write(f"- Total file changes across all commits: {summary['total_commit_files']}\n")
+        else:
+            f.write(f"## Archived Files ({summary['total_files']})\n\n")
+            for file_path in sorted(summary['archived_files']):
+                f.write(f"- `{file_path}`\n")
+
+
+class JsonChangelogWriter(ChangelogWriter):
+    """Writes one JSON document incrementally, one commit object at a time."""
+    extension = '.json'
+
+    def begin(self, info):
+        header = {k: info[k] for k in ('archive_name', 'repository', 'range_info', 'total_files', 'commit_count')}
+        if info.get('large_files'):
+            header['large_files'] = info['large_files']
+        # Emit the header fields, then leave the commits array open
+        self.f.write(json.dumps(header, ensure_ascii=False)[:-1] + ', "commits": [')
+        self._first = True
+
+    def commit(self, index, commit, files):
+        record = {
+            'index': index,
+            'hash': commit['hash'],
+            'author_name': commit['author_name'],
+            'author_email': commit['author_email'],
+            'date': commit['date'],
+            'message': commit['message'],
+            'is_merge': commit.get('is_merge', False),
+            'files': sorted(files)
+        }
+        self.f.write(('\n  ' if self._first else ',\n  ') + json.dumps(record, ensure_ascii=False))
+        self._first = False
+
+    def end(self, summary):
+        summary = dict(summary, archived_files=sorted(summary['archived_files']))
+        self.f.write('\n], "summary": ' + json.dumps(summary, ensure_ascii=False) + '}\n')
+
+
+class CsvChangelogWriter(ChangelogWriter):
+    """One row per (commit, archived file); commits without files get one empty-path row."""
+    extension = '.csv'
+    columns = ['index', 'hash', 'author_name', 'author_email', 'date', 'message', 'is_merge', 'file']
+
+    def begin(self, info):
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(self.columns)
+
+    def commit(self, index, commit, files):
+        row = [index, commit['hash'], commit['author_name'], commit['author_email'],
+               commit['date'], commit['message'], int(commit.get('is_merge', False))]
+        for file_path in sorted(files) or ['']:
+            self.writer.writerow(row + [file_path])
+
+    def end(self, summary):
+        if not summary['total_commits']:
+            for file_path in sorted(summary['archived_files']):
+                self.writer.writerow(['', '', '', '', '', '', '', file_path])
+
+
+WRITERS = {
+    'txt': TextChangelogWriter,
+    'md': MarkdownChangelogWriter,
+    'json': JsonChangelogWriter,
+    'csv': CsvChangelogWriter,
+}
+
+
+def write_changelogs(base_path, formats, info, commits, archived_files, on_commit=None):
+    """
+    Render changelogs for every requested format in a single pass over
+    `commits`, which may be any iterable (including a generator). Membership
+    checks against the archived files use a set. Returns the written paths.
+    """
+    archived_set = set(archived_files)
+    writers = [WRITERS[fmt](f"{base_path}{WRITERS[fmt].extension}") for fmt in formats]
+    total_commits = 0
+    total_commit_files = 0
+    try:
+        for writer in writers:
+            writer.begin(info)
+
+        for index, commit in enumerate(commits, 1):
+            if on_commit:
+                on_commit(index)
+            commit_archived_files = [f for f in commit.get('files', []) if f in archived_set]
+            total_commit_files += len(commit_archived_files)
+            total_commits = index
+            for writer in writers:
+                writer.commit(index, commit, commit_archived_files)
+
+        summary = {
+            'total_commits': total_commits,
+            'total_files': len(archived_set),
+            'total_commit_files': total_commit_files,
+            'archived_files': archived_set
+        }
+        for writer in writers:
+            writer.end(summary)
+    finally:
+        for writer in writers:
+            writer.close()
+    return [writer.path for writer in writers]
+
+
+def changelog_info(archive_name_base, archive_ext, repo_path, range_info, total_files, commit_count,
+                   large_files=None):
+    """Header fields shared by every changelog format. `large_files` holds large-file/LFS decision records."""
+    return {
+        'archive_name': f"{os.path.basename(archive_name_base)}{archive_ext}",
+        'repository': os.path.abspath(repo_path),
+        'range_info': range_info,
+        'total_files': total_files,
+        'commit_count': commit_count,
+        'large_files': large_files or []
+    }
@@ -0,0 +1,102 @@
+import sys
+import binascii
+from array import array
+
+# Compact commit records for very large ranges. A plain dict per commit (five
+# string keys plus a list of path strings) costs well over a kilobyte; a
+# slotted record holds the SHA as 20 raw bytes, shares author strings through
+# sys.intern and stores its changed files as an array of integer IDs into a
+# PathTable, where each distinct path string is kept once.
+#
+# Records still support the read-only dict protocol (commit['hash'],
+# commit.get('files', [])) used by the changelog writers and the series
+# index, and to_dict() gives the plain form for JSON.
+
+
+class PathTable:
+    """Interns paths: each distinct path is stored once and referred to by an integer ID."""
+
+    __slots__ = ('_ids', '_paths')
+
+    def __init__(self):
+        self._ids = {}
+        self._paths = []
+
+    def id_for(self, path):
+        path_id = self._ids.get(path)
+        if path_id is None:
+            path_id = len(self._paths)
+            self._ids[path] = path_id
+            self._paths.append(path)
+        return path_id
+
+    def ids_for(self, paths):
+        """Return an array('I') of IDs for an iterable of paths."""
+        return array('I', [self.id_for(path) for path in paths])
+
+    def path(self, path_id):
+        return self._paths[path_id]
+
+    def paths(self, path_ids):
+        return [self._paths[path_id] for path_id in path_ids]
+
+    def __len__(self):
+        return len(self._paths)
+
+
+_NO_FILES = array('I')
+
+
+class CommitRecord:
+    """One commit: hash, author, date, subject, merge flag and changed-file IDs."""
+
+    __slots__ = ('_binsha', 'author_name', 'author_email', 'date', 'message', 'is_merge', '_file_ids', '_paths')
+
+    FIELDS = ('hash', 'author_name', 'author_email', 'date', 'message', 'is_merge', 'files')
+
+    def __init__(self, hexsha, author_name, author_email, date, message, is_merge=False):
+        self._binsha = binascii.unhexlify(hexsha)
+        self.author_name = sys.intern(author_name)
+        self.author_email = sys.intern(author_email)
+        self.date = date
+        self.message = message
+        self.is_merge = is_merge
+        self._file_ids = _NO_FILES
+        self._paths = None
+
+    @classmethod
+    def from_details(cls, details):
+        """Build a record from a get_commit_details()-style dictionary."""
+        return cls(details['hash'], details['author_name'], details['author_email'], details['date'],
+                   details['message'], details.get('is_merge', False))
+
+    @property
+    def hash(self):
+        return binascii.hexlify(self._binsha).decode('ascii')
+
+    @property
+    def files(self):
+        if self._paths is None:
+            return []
+        return self._paths.paths(self._file_ids)
+
+    def set_files(self, paths, path_table):
+        self._paths = path_table
+        self._file_ids = path_table.ids_for(paths)
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def to_dict(self):
+        return dict((field, getattr(self, field)) for field in self.FIELDS)
+
+    def __repr__(self):
+        return f"CommitRecord({self.hash[:10]}, {self.message[:40]!r}, {len(self._file_ids)} files)"
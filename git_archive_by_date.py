@@ -1,14 +1,26 @@
-
-
+import startup_profile  # First, so startup timing covers every import below
 import os
-import argparse
+import sys
 import subprocess
-import shutil
-import tempfile
-import json
-from datetime import datetime
+
+import git_batch
+from git_objects import GitObjectError, DEFAULT_DELTA_CACHE_BYTES, open_object_store, parse_signature
+from tree_diff import diff_commits
+from commit_records import CommitRecord, PathTable
 
 # This script can be run as a standalone CLI or imported by another script (like a UI).
+# Archive writers, hashing, changelog renderers and thread pools are imported
+# inside the functions that use them, so `--help`, short scripted calls and
+# the UI's first paint do not pay for them.
+
+# Pathspec arguments per git invocation, kept well inside the ~32K character
+# command-line limit on Windows
+PATHSPEC_CHUNK_CHARS = 24000
+SERIES_INDEX_SUFFIX = '.series.json'
+PATCH_PREFIX = 'patches/'
+PATCH_SLUG_LENGTH = 52
+PATCH_MODES = ['commit', 'range']
+EMPTY_TREE_SHA = '4b825dc642cb6eb9a060e54bf8d69288fbee4904'
 
 def run_command(command, cwd):
     """Runs a shell command and returns its output."""
@@ -32,10 +44,29 @@ def run_command(command, cwd):
     except subprocess.CalledProcessError:
         return None
 
-def get_commit_details(repo_path, commit_hash):
+def run_command_bytes(command, cwd):
+    """Runs a command and returns its raw stdout, or None if it fails."""
+    startupinfo = None
+    if os.name == 'nt':
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    try:
+        return subprocess.run(command, cwd=cwd, check=True, capture_output=True, startupinfo=startupinfo).stdout
+    except subprocess.CalledProcessError:
+        return None
+
+def get_commit_details(repo_path, commit_hash, store=None):
     """Get commit message, author, and date for a specific commit."""
     if not commit_hash:
         return None
+
+    if store:
+        try:
+            resolved = store.resolve(commit_hash)
+            if resolved:
+                return store.commit_details(resolved)
+        except GitObjectError:
+            pass  # Fall back to the git CLI
     
     # Get commit info in a structured format
     log_cmd = ['git', 'log', '-1', '--pretty=format:%H|%an|%ae|%ad|%s', '--date=iso', commit_hash]
@@ -53,45 +84,185 @@ def get_commit_details(repo_path, commit_hash):
             }
     return None
 
-def get_commits_in_range(repo_path, mode, **kwargs):
-    """Get all commits in the specified range with their details."""
-    commits = []
-    
+def read_commit_headers(repo_path, commit_hash):
+    """
+    Parents and committer of a commit through the shared `git cat-file --batch`
+    process, or None when it is unavailable (callers then run git directly).
+    """
+    answer = git_batch.read_object(repo_path, f"{commit_hash}^{{commit}}")
+    if not answer or answer[1] != 'commit':
+        return None
+    commit = {'hash': answer[0], 'parents': [], 'committer': None}
+    header = answer[2].partition(b'\n\n')[0]
+    for line in header.decode('utf-8', errors='ignore').splitlines():
+        key, _, value = line.partition(' ')
+        if key == 'parent':
+            commit['parents'].append(value)
+        elif key == 'committer':
+            commit['committer'] = parse_signature(value)
+    return commit
+
+def get_commit_timestamp(repo_path, commit_hash, store=None):
+    """Committer time of a commit as a Unix timestamp, or None."""
+    if store:
+        try:
+            resolved = store.resolve(commit_hash)
+            if resolved:
+                return int(store.read_commit(resolved)['committer'][2])
+        except (GitObjectError, KeyError, ValueError):
+            pass  # Fall back to the git CLI
+    commit = read_commit_headers(repo_path, commit_hash)
+    if commit and commit['committer']:
+        return int(commit['committer'][2])
+    output = run_command(['git', 'show', '-s', '--format=%ct', commit_hash], repo_path)
+    try:
+        return int(output.strip()) if output else None
+    except ValueError:
+        return None
+
+def stream_command(command, cwd):
+    """Runs a command and yields its output line by line as it is produced."""
+    startupinfo = None
+    if os.name == 'nt':
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    try:
+        process = subprocess.Popen(
+            command,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding='utf-8',
+            errors='ignore',
+            startupinfo=startupinfo
+        )
+    except OSError:
+        return
+    try:
+        for line in process.stdout:
+            yield line.rstrip('\n')
+    finally:
+        process.stdout.close()
+        process.wait()
+
+def stream_command_bytes(command, cwd):
+    """Runs a command and yields its raw output line by line as it is produced."""
+    startupinfo = None
+    if os.name == 'nt':
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    try:
+        process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                   startupinfo=startupinfo)
+    except OSError:
+        return
+    try:
+        for line in process.stdout:
+            yield line
+    finally:
+        process.stdout.close()
+        process.wait()
+
+def iter_commits_from_store(store, mode, **kwargs):
+    """
+    Yield commits for SHA-based modes from the in-process object store.
+    Yields nothing and returns False when the range cannot be resolved
+    in-process, so the caller can fall back to the git CLI. A GitObjectError
+    after the first commit is re-raised, since a fallback would repeat the
+    commits already yielded.
+    """
+    yielded = False
+    try:
+        if mode == 'sha_range':
+            start = store.resolve(kwargs.get('start_sha'))
+            end = store.resolve(kwargs.get('end_sha'))
+            if not start or not end:
+                return False
+            for hexsha in store.walk_commits(end, exclude=start):
+                record = CommitRecord.from_details(store.commit_details(hexsha))
+                yielded = True
+                yield record
+            return True
+        elif mode == 'commit_sha':
+            commit = store.resolve(kwargs.get('commit_sha'))
+            if not commit:
+                return False
+            yield CommitRecord.from_details(store.commit_details(commit))
+            return True
+    except GitObjectError:
+        if yielded:
+            raise
+    return False
+
+def commit_range_args(mode, **kwargs):
+    """The revision arguments shared by `git log` and `git rev-list` for a mode."""
     if mode == 'date':
         branch = kwargs.get('branch')
         start_date = kwargs.get('start_date')
         end_date = kwargs.get('end_date')
-        log_cmd = ['git', 'log', branch, f'--since="{start_date} 00:00:00"', f'--until="{end_date} 23:59:59"', 
-                   '--pretty=format:%H|%an|%ae|%ad|%s', '--date=iso']
+        return [branch, f'--since="{start_date} 00:00:00"', f'--until="{end_date} 23:59:59"']
     elif mode == 'sha_range':
-        start_sha = kwargs.get('start_sha')
-        end_sha = kwargs.get('end_sha')
-        log_cmd = ['git', 'log', f'{start_sha}..{end_sha}', '--pretty=format:%H|%an|%ae|%ad|%s', '--date=iso']
+        return [f"{kwargs.get('start_sha')}..{kwargs.get('end_sha')}"]
     elif mode == 'commit_sha':
-        commit_sha = kwargs.get('commit_sha')
-        log_cmd = ['git', 'log', '-1', '--pretty=format:%H|%an|%ae|%ad|%s', '--date=iso', commit_sha]
-    else:
-        return commits
-    
-    commit_output = run_command(log_cmd, repo_path)
-    if commit_output:
-        for line in commit_output.splitlines():
-            parts = line.split('|', 4)
-            if len(parts) == 5:
-                commits.append({
-                    'hash': parts[0],
-                    'author_name': parts[1],
-                    'author_email': parts[2],
-                    'date': parts[3],
-                    'message': parts[4]
-                })
-    
-    return commits
+        return ['-1', kwargs.get('commit_sha')]
+    return None
+
+def iter_commits_in_range(repo_path, mode, store=None, **kwargs):
+    """Yield the commits in the specified range as CommitRecords, newest first."""
+    if store and mode in ('sha_range', 'commit_sha'):
+        resolved = yield from iter_commits_from_store(store, mode, **kwargs)
+        if resolved:
+            return
+
+    range_args = commit_range_args(mode, **kwargs)
+    if range_args is None:
+        return
+    log_cmd = ['git', 'log'] + range_args + ['--pretty=format:%H|%an|%ae|%ad|%s', '--date=iso']
+
+    for line in stream_command(log_cmd, repo_path):
+        parts = line.split('|', 4)
+        if len(parts) == 5:
+            yield CommitRecord(parts[0], parts[1], parts[2], parts[3], parts[4])
+
+def get_commits_in_range(repo_path, mode, store=None, **kwargs):
+    """Get all commits in the specified range with their details."""
+    return list(iter_commits_in_range(repo_path, mode, store=store, **kwargs))
+
+def count_commits_in_range(repo_path, mode, store=None, **kwargs):
+    """Count the commits in a range without loading their details."""
+    if store and mode == 'commit_sha':
+        try:
+            if store.resolve(kwargs.get('commit_sha')):
+                return 1
+        except GitObjectError:
+            pass
+    range_args = commit_range_args(mode, **kwargs)
+    if range_args is None:
+        return 0
+    count = run_command(['git', 'rev-list', '--count'] + range_args, repo_path)
+    return int(count) if count and count.isdigit() else 0
 
-def get_files_changed_in_commit(repo_path, commit_hash):
+def get_files_changed_in_commit(repo_path, commit_hash, store=None):
     """Get list of files changed in a specific commit."""
     if not commit_hash:
         return []
+
+    if store:
+        # Non-merge commits are diffed against their parent in-process;
+        # merges keep the combined-diff semantics of the git CLI below.
+        try:
+            parents = store.read_commit(commit_hash)['parents']
+            if len(parents) <= 1:
+                parent = parents[0] if parents else None
+                return [c['path'] for c in diff_commits(store, parent, commit_hash, with_sizes=False)]
+        except GitObjectError:
+            pass
+
+    # One long-lived `git diff-tree --stdin` answers every commit
+    paths = git_batch.changed_paths(repo_path, commit_hash)
+    if paths is not None:
+        return paths
     
     # First check if this is a merge commit
     merge_check_cmd = ['git', 'cat-file', '-p', commit_hash]
@@ -105,25 +276,35 @@ def get_files_changed_in_commit(repo_path, commit_hash):
     if is_merge_commit:
         # For merge commits, get files that were actually changed in the merge
         # Use --cc flag to show combined diff for merge commits
-        show_cmd = ['git', 'show', '--name-only', '--cc', '--pretty=format:', commit_hash]
+        show_cmd = ['git', '-c', 'core.quotePath=false', 'show', '--name-only', '--cc', '--pretty=format:',
+                    commit_hash]
         files_output = run_command(show_cmd, repo_path)
         
         if not files_output or not files_output.strip():
             # If no files in combined diff, try getting files from the merge parents
             # This shows files that were different between the merged branches
-            diff_cmd = ['git', 'diff-tree', '--name-only', '-r', commit_hash]
+            diff_cmd = ['git', '-c', 'core.quotePath=false', 'diff-tree', '--name-only', '-r', commit_hash]
             files_output = run_command(diff_cmd, repo_path)
     else:
         # Regular commit
-        show_cmd = ['git', 'show', '--name-only', '--pretty=format:', commit_hash]
+        show_cmd = ['git', '-c', 'core.quotePath=false', 'show', '--name-only', '--pretty=format:', commit_hash]
         files_output = run_command(show_cmd, repo_path)
     
     if files_output:
         return [f.strip() for f in files_output.splitlines() if f.strip()]
     return []
 
-def is_merge_commit(repo_path, commit_hash):
+def is_merge_commit(repo_path, commit_hash, store=None):
     """Check if a commit is a merge commit."""
+    if store:
+        try:
+            return len(store.read_commit(commit_hash)['parents']) > 1
+        except GitObjectError:
+            pass  # Fall back to the git CLI
+
+    commit = read_commit_headers(repo_path, commit_hash)
+    if commit:
+        return len(commit['parents']) > 1
     merge_check_cmd = ['git', 'cat-file', '-p', commit_hash]
     commit_info = run_command(merge_check_cmd, repo_path)
     
@@ -132,16 +313,422 @@ def is_merge_commit(repo_path, commit_hash):
         return len(parent_lines) > 1
     return False
 
-def get_commits_with_files(repo_path, mode, **kwargs):
+def iter_commits_with_files(repo_path, mode, store=None, path_table=None, **kwargs):
+    """
+    Yield commits with their associated changed files, one at a time. Paths
+    are interned in `path_table` (a new PathTable by default), so a path
+    touched by many commits is held once.
+    """
+    path_table = path_table if path_table is not None else PathTable()
+    for commit in iter_commits_in_range(repo_path, mode, store=store, **kwargs):
+        # Add files and merge info for each commit
+        commit.set_files(get_files_changed_in_commit(repo_path, commit.hash, store=store), path_table)
+        commit.is_merge = is_merge_commit(repo_path, commit.hash, store=store)
+        yield commit
+
+def get_commits_with_files(repo_path, mode, store=None, path_table=None, **kwargs):
     """Get commits with their associated changed files."""
-    commits = get_commits_in_range(repo_path, mode, **kwargs)
-    
-    # Add files and merge info for each commit
-    for commit in commits:
-        commit['files'] = get_files_changed_in_commit(repo_path, commit['hash'])
-        commit['is_merge'] = is_merge_commit(repo_path, commit['hash'])
-    
-    return commits
+    return list(iter_commits_with_files(repo_path, mode, store=store, path_table=path_table, **kwargs))
+
+def get_changed_files_from_store(store, start_sha, end_sha):
+    """
+    Compute the changed path set between two commits with the in-process
+    tree-diff engine. Returns (sorted paths, manifest) where the manifest maps
+    each path to its change record (blob OID, mode and size), or None when the
+    range cannot be resolved in-process.
+    """
+    try:
+        start = store.resolve(start_sha)
+        end = store.resolve(end_sha)
+        if not start or not end:
+            return None
+        changes = diff_commits(store, start, end)
+    except GitObjectError:
+        return None
+    manifest = {change['path']: change for change in changes}
+    return sorted(manifest), manifest
+
+def get_tree_diff_files(repo_path, base, end, store=None):
+    """
+    Changed paths between the trees of two commits (`base` None means the
+    empty tree) as `git diff --name-only` output, plus the in-process blob
+    manifest when the store computed it (otherwise None).
+    """
+    store_diff = get_changed_files_from_store(store, base, end) if store and base else None
+    if store_diff:
+        changed_paths, blob_manifest = store_diff
+        return '\n'.join(changed_paths), blob_manifest
+    return run_command(['git', '-c', 'core.quotePath=false', 'diff', '--name-only', base or EMPTY_TREE_SHA, end],
+                       repo_path), None
+
+def get_date_range_files(repo_path, plan, range_kwargs, store=None):
+    """
+    Changed paths of a date window as the plan resolves them: the union of
+    every commit's files from `git log`, or the net changes between two
+    trees for a tree-diff plan. Returns (output, blob manifest or None).
+    """
+    if plan['strategy'] == 'tree-diff':
+        return get_tree_diff_files(repo_path, plan['base'], plan['end'], store)
+    log_cmd = ['git', '-c', 'core.quotePath=false', 'log', range_kwargs['branch'],
+               f'--since="{range_kwargs["start_date"]} 00:00:00"', f'--until="{range_kwargs["end_date"]} 23:59:59"',
+               '--name-only', '--pretty=format:']
+    return run_command(log_cmd, repo_path), None
+
+def export_cache_key(repo_path, params, store, latest_commit_hash, changed_files, archive_format,
+                     changelog_formats, changelog_range_info):
+    """
+    Artifact cache key for an export, or None if any revision in the request
+    cannot be resolved to a commit OID (e.g. a branch that no longer exists).
+    """
+    from artifact_cache import artifact_key
+    mode = params['mode']
+    if mode == 'date':
+        revs = [params.get('branch')]
+    elif mode == 'sha_range':
+        revs = [params.get('start_sha'), params.get('end_sha')]
+    else:
+        revs = [params.get('commit_sha')]
+    resolved = [resolve_commit(repo_path, rev, store) for rev in revs]
+    end_oid = resolve_commit(repo_path, latest_commit_hash, store)
+    if not all(resolved) or not end_oid:
+        return None
+    extra = [mode, resolved, params.get('start_date'), params.get('end_date'),
+             changelog_formats, changelog_range_info, params.get('patches'),
+             params.get('large_file_mb'), params.get('large_file_policy'), params.get('lfs'),
+             bool(params.get('reproducible', True)), bool(params.get('date_tree_diff'))]
+    return artifact_key(repo_path, end_oid, changed_files, archive_format, extra)
+
+def read_file_at_commit(repo_path, commit_hash, file_path, blob_reader=None):
+    """
+    Read a file's contents at a commit. Uses the in-process BlobReader when
+    available, then the shared `git cat-file --batch` process, and falls back
+    to `git show`. Returns None if the file is missing.
+    """
+    if blob_reader:
+        try:
+            return blob_reader.read(file_path)
+        except GitObjectError:
+            pass  # Fall back to the git CLI
+
+    answer = git_batch.read_object(repo_path, f'{commit_hash}:{file_path}')
+    if answer is not False:
+        return answer[2] if answer and answer[1] == 'blob' else None
+    return run_command_bytes(['git', 'show', f'{commit_hash}:{file_path}'], repo_path)
+
+def format_commit_patch(repo_path, commit_hash):
+    """A commit as a mailbox-style patch (`git format-patch`), as bytes."""
+    patch_cmd = ['git', 'format-patch', '-1', '--stdout', '--binary', '--full-index', '--no-signature', commit_hash]
+    return run_command_bytes(patch_cmd, repo_path)
+
+def iter_commit_patches(repo_path, range_args):
+    """
+    Yield (commit, patch bytes) for every non-merge commit of a range, newest
+    first, from one streamed `git format-patch` run. Each patch is identical
+    to format_commit_patch() for that commit.
+    """
+    import re
+    command = ['git', 'format-patch', '--stdout', '--binary', '--full-index', '--no-signature',
+               '--no-numbered', '--root', '--reverse'] + range_args
+    header = re.compile(rb'From ([0-9a-f]{40}) Mon Sep 17 00:00:00 2001\n$')
+    commit_hash, lines = None, []
+    for line in stream_command_bytes(command, repo_path):
+        match = header.match(line)
+        if match:
+            if commit_hash:
+                yield commit_hash, b''.join(lines)[:-1]  # Less the blank line between patches
+            commit_hash, lines = match.group(1).decode('ascii'), []
+        lines.append(line)
+    if commit_hash:
+        yield commit_hash, b''.join(lines)
+
+class PatchStream:
+    """
+    Hands out the patches of iter_commit_patches() by commit as a commit walk
+    reaches them. Commits the stream does not hold get a format_commit_patch().
+    """
+
+    def __init__(self, repo_path, range_args):
+        self.repo_path = repo_path
+        self.patches = iter_commit_patches(repo_path, range_args)
+        self.pending = {}  # Read ahead of a walk that visits commits in another order
+
+    def patch(self, commit_hash):
+        if commit_hash in self.pending:
+            return self.pending.pop(commit_hash)
+        for streamed_hash, patch in self.patches:
+            if streamed_hash == commit_hash:
+                return patch
+            self.pending[streamed_hash] = patch
+        return format_commit_patch(self.repo_path, commit_hash)
+
+    def close(self):
+        self.patches.close()
+
+def format_range_patch(repo_path, base, end):
+    """The cumulative unified diff from base to end, as bytes."""
+    return run_command_bytes(['git', 'diff', '--binary', '--full-index', base, end], repo_path)
+
+def patch_file_name(number, subject):
+    """`git format-patch` style name: 0001-Subject-words.patch."""
+    import re
+    slug = re.sub(r'[^A-Za-z0-9_.]+', '-', subject or '').strip('-.')[:PATCH_SLUG_LENGTH].rstrip('-.')
+    return f"{number:04d}-{slug or 'patch'}.patch"
+
+def iter_pathspec_chunks(paths, max_chars=PATHSPEC_CHUNK_CHARS):
+    """Split paths into lists whose combined argument length stays under max_chars."""
+    chunk = []
+    length = 0
+    for path in paths:
+        if chunk and length + len(path) + 1 > max_chars:
+            yield chunk
+            chunk, length = [], 0
+        chunk.append(path)
+        length += len(path) + 1
+    if chunk:
+        yield chunk
+
+def get_tree_entries(repo_path, commit_hash, store=None, paths=None):
+    """
+    List every path in a commit's tree in one pass (`git ls-tree -r`), or
+    only `paths` when given. Returns a dictionary of path -> (mode, type, oid),
+    or None on failure. Submodules appear with type 'commit'.
+    """
+    if store:
+        try:
+            resolved = store.resolve(commit_hash)
+            if resolved:
+                if paths is None:
+                    tree = store.read_commit(resolved)['tree']
+                    listing = store.walk_tree(tree)
+                else:
+                    found = ((path, store.lookup_path(resolved, path)) for path in paths)
+                    listing = ((path, hit[0], hit[1]) for path, hit in found if hit and hit[0] != '40000')
+                return dict((path, (mode, 'commit' if mode == '160000' else 'blob', oid))
+                            for path, mode, oid in listing)
+        except GitObjectError:
+            pass  # Fall back to the git CLI
+
+    if paths is None:
+        commands = [['git', 'ls-tree', '-r', '-z', '--full-tree', commit_hash]]
+    else:
+        commands = [['git', '--literal-pathspecs', 'ls-tree', '-r', '-z', '--full-tree', commit_hash, '--'] + chunk
+                    for chunk in iter_pathspec_chunks(paths)]
+    entries = {}
+    for command in commands:
+        output = run_command(command, repo_path)
+        if output is None:
+            return None
+        for record in output.split('\0'):
+            if not record:
+                continue
+            meta, _, path = record.partition('\t')
+            mode, obj_type, oid = meta.split()
+            entries[path] = (mode, obj_type, oid)
+    return entries
+
+def run_cat_file_batch(repo_path, option, oids):
+    """Feed OIDs to one `git cat-file <option>` process and return its raw stdout, or None."""
+    startupinfo = None
+    if os.name == 'nt':
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    try:
+        return subprocess.run(['git', 'cat-file', option], cwd=repo_path, check=True, capture_output=True,
+                              input=''.join(f"{oid}\n" for oid in oids).encode('ascii'),
+                              startupinfo=startupinfo).stdout
+    except subprocess.CalledProcessError:
+        return None
+
+def get_blob_sizes(repo_path, oids, store=None):
+    """
+    Sizes of many blobs in one batch: object headers from the store, or a
+    single `git cat-file --batch-check`. Returns oid -> size; unknown OIDs
+    are left out.
+    """
+    oids = sorted(set(oids))
+    sizes = {}
+    if store:
+        for oid in oids:
+            try:
+                sizes[oid] = store.object_size(oid)
+            except GitObjectError:
+                pass
+        oids = [oid for oid in oids if oid not in sizes]
+    if oids:
+        output = run_cat_file_batch(repo_path, '--batch-check', oids) or b''
+        for line in output.decode('ascii', errors='replace').splitlines():
+            parts = line.split()
+            if len(parts) == 3 and parts[2].isdigit():
+                sizes[parts[0]] = int(parts[2])
+    return sizes
+
+def read_blobs(repo_path, oids, store=None):
+    """Contents of many (small) blobs: from the store, or a single `git cat-file --batch`. Returns oid -> bytes."""
+    oids = sorted(set(oids))
+    blobs = {}
+    if store:
+        for oid in oids:
+            try:
+                blobs[oid] = store.read(oid)[1]
+            except GitObjectError:
+                pass
+        oids = [oid for oid in oids if oid not in blobs]
+    if oids:
+        output = run_cat_file_batch(repo_path, '--batch', oids) or b''
+        pos = 0
+        while pos < len(output):
+            header_end = output.index(b'\n', pos)
+            parts = output[pos:header_end].split()
+            pos = header_end + 1
+            if len(parts) != 3:
+                continue  # "<oid> missing"
+            size = int(parts[2])
+            blobs[parts[0].decode('ascii')] = output[pos:pos + size]
+            pos += size + 1
+    return blobs
+
+def plan_large_file_handling(repo_path, paths, tree_entries, store=None, params=None):
+    """
+    Apply the large-file and LFS options in params to the blobs among
+    `paths`, reading only sizes (and the bytes of pointer-sized blobs when
+    LFS pointers are resolved). Returns path -> decision (see
+    large_files.plan_large_files), empty when no option is set.
+    """
+    from large_files import LFS_POINTER_MAX_BYTES, parse_lfs_pointer, plan_large_files
+    params = params or {}
+    threshold = int(float(params.get('large_file_mb') or 0) * 1024 * 1024)
+    resolve_lfs = params.get('lfs') == 'resolve'
+    if tree_entries is None or not (threshold or resolve_lfs):
+        return {}
+    blobs = dict((path, tree_entries[path][2]) for path in paths
+                 if path in tree_entries and tree_entries[path][1] == 'blob' and tree_entries[path][0] != '120000')
+    sizes = get_blob_sizes(repo_path, blobs.values(), store)
+    pointers = {}
+    if resolve_lfs:
+        candidates = [oid for oid in set(blobs.values()) if sizes.get(oid, LFS_POINTER_MAX_BYTES + 1) <= LFS_POINTER_MAX_BYTES]
+        for oid, data in read_blobs(repo_path, candidates, store).items():
+            pointer = parse_lfs_pointer(data)
+            if pointer:
+                pointers[oid] = pointer
+    return plan_large_files(blobs, sizes, pointers, os.path.join(repo_path, '.git'), threshold,
+                            params.get('large_file_policy') or 'store')
+
+def resolve_commit(repo_path, rev, store=None):
+    """Resolve a revision to a full commit SHA, preferring the object store."""
+    if store:
+        try:
+            resolved = store.resolve(rev)
+            if resolved:
+                return resolved
+        except GitObjectError:
+            pass
+    answer = git_batch.object_info(repo_path, f'{rev}^{{commit}}')
+    if answer is not False:
+        return answer[0] if answer else None
+    return run_command(['git', 'rev-parse', '--verify', f'{rev}^{{commit}}'], repo_path)
+
+def archive_commit_file(archive_writer, repo_path, commit_hash, file_path, tree_entries, blob_reader=None,
+                        log_callback=print, compress=True):
+    """
+    Add one path, as of commit_hash, to an archive with its git mode (regular,
+    executable or symlink). `tree_entries` comes from get_tree_entries(); when
+    it is None modes are unknown and everything is written as a regular file.
+    Returns (EntryDigest, tree entry or None), or None if the path was skipped.
+    """
+    from archive_writer import EXECUTABLE_MODE, FILE_MODE
+    entry = tree_entries.get(file_path) if tree_entries is not None else None
+    if tree_entries is not None and entry is None:
+        log_callback(f"Warning: Could not find '{file_path}' in commit {commit_hash[:10]}. Skipping.")
+        return None
+    if entry and entry[1] == 'commit':
+        log_callback(f"Skipping submodule '{file_path}' (gitlink to {entry[2][:10]}).")
+        return None
+    content = read_file_at_commit(repo_path, commit_hash, file_path, blob_reader)
+    if content is None:
+        log_callback(f"Warning: Could not find '{file_path}' in commit {commit_hash[:10]}. Skipping.")
+        return None
+    if entry and entry[0] == '120000':
+        digest = archive_writer.add_symlink(file_path, content)
+    else:
+        digest = archive_writer.add_file(file_path, content,
+                                         mode=EXECUTABLE_MODE if entry and entry[0] == '100755' else FILE_MODE,
+                                         compress=compress)
+    return digest, entry
+
+def git_archive_blocker(repo_path, tree_entries, store=None, params=None):
+    """
+    Return why the `git archive` fast path cannot be used, or None if it can.
+    `git archive` applies export-subst/export-ignore and checkout filters
+    (eol, ident, LFS smudge) from attributes, so any attributes source means
+    its output could differ from the raw blobs the per-blob engine archives.
+    """
+    if params and not params.get('git_archive', True):
+        return "disabled"
+    if store:
+        return "in-process backend reads blobs directly"
+    if tree_entries is None:
+        return "no tree listing"
+    if any(path == '.gitattributes' or path.endswith('/.gitattributes') for path in tree_entries):
+        return ".gitattributes in tree"
+    attribute_files = [os.path.join(repo_path, '.git', 'info', 'attributes'),
+                       os.path.join(os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config'), 'git', 'attributes')]
+    if any(os.path.isfile(path) and os.path.getsize(path) for path in attribute_files):
+        return "attributes file in repository or user config"
+    if run_command(['git', 'config', '--get', 'core.attributesFile'], repo_path):
+        return "core.attributesFile is set"
+    return None
+
+def iter_git_archive_files(archive_writer, repo_path, commit_hash, paths, tree_entries, stats, uncompressed=(),
+                           whole_tree=False, before_member=None):
+    """
+    Fast path: stream `git archive --format=tar` for the given blob paths (in
+    pathspec chunks, one git process each, or one stream of the whole tree
+    when `whole_tree`) and re-emit each member into archive_writer, without
+    compression for paths in `uncompressed`. Yields (path, (EntryDigest, tree
+    entry)) in archive order. `before_member(path)` is called before each
+    member is written, so the caller can add entries that sort before it.
+    Stops early, leaving the remaining paths to the caller, if git fails.
+    """
+    import tarfile
+    from archive_writer import EXECUTABLE_MODE, FILE_MODE
+    wanted = set(paths)
+    startupinfo = None
+    if os.name == 'nt':
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    # Neutralise eol conversion from config; attribute-driven conversion is ruled out by git_archive_blocker()
+    base_cmd = ['git', '-c', 'core.autocrlf=false', '-c', 'core.eol=lf', '--literal-pathspecs',
+                'archive', '--format=tar', commit_hash, '--']
+    for chunk in ([[]] if whole_tree else iter_pathspec_chunks(paths)):
+        process = subprocess.Popen(base_cmd + chunk, cwd=repo_path, stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL, startupinfo=startupinfo)
+        stats['git_processes'] += 1
+        try:
+            with tarfile.open(fileobj=process.stdout, mode='r|') as tf:
+                for member in tf:
+                    if member.name not in wanted:
+                        continue  # Directory entries
+                    entry = tree_entries[member.name]
+                    if before_member and (member.issym() or member.isreg()):
+                        before_member(member.name)
+                    if member.issym():
+                        target = member.linkname.encode('utf-8', errors='surrogateescape')
+                        digest = archive_writer.add_symlink(member.name, target)
+                    elif member.isreg():
+                        mode = EXECUTABLE_MODE if entry[0] == '100755' else FILE_MODE
+                        digest = archive_writer.add_file(member.name, tf.extractfile(member), size=member.size,
+                                                         mode=mode, compress=member.name not in uncompressed)
+                    else:
+                        continue
+                    yield member.name, (digest, entry)
+        except tarfile.TarError:
+            process.kill()
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        if returncode != 0:
+            stats['fallback_reason'] = f"git archive exited with status {returncode}"
+            return
 
 def get_file_list_preview(params):
     """
@@ -157,6 +744,9 @@ def get_file_list_preview(params):
     files_output = None
     latest_commit_hash = None
     commits_info = []
+    # A caller-owned store (e.g. the server's warm repository cache) is used as-is
+    shared_store = params.get('object_store')
+    store = shared_store or (open_object_store(repo_path) if params.get('backend') == 'python' else None)
     
     try:
         if mode == 'date':
@@ -165,23 +755,31 @@ def get_file_list_preview(params):
             latest_commit_hash = run_command(latest_commit_cmd, repo_path)
             if not latest_commit_hash:
                 return {'error': f"Could not find a commit on branch '{branch}' before '{end_date}'."}
-            log_cmd = ['git', 'log', branch, f'--since="{start_date} 00:00:00"', f'--until="{end_date} 23:59:59"', '--name-only', '--pretty=format:']
-            files_output = run_command(log_cmd, repo_path)
-            commits_info = get_commits_with_files(repo_path, 'date', branch=branch, start_date=start_date, end_date=end_date)
+            # Same file set as the archive, whichever way the planner resolves the window
+            from range_planner import plan_range
+            range_kwargs = {'branch': branch, 'start_date': start_date, 'end_date': end_date}
+            plan = (plan_range(repo_path, mode, range_kwargs, latest_commit_hash, store, True)
+                    if params.get('date_tree_diff') else {'strategy': 'log-walk'})
+            files_output = get_date_range_files(repo_path, plan, range_kwargs, store)[0]
+            commits_info = get_commits_with_files(repo_path, 'date', store=store, **range_kwargs)
             
         elif mode == 'sha_range':
             start_sha, end_sha = params['start_sha'], params['end_sha']
             latest_commit_hash = end_sha
-            diff_cmd = ['git', 'diff', '--name-only', f'{start_sha}..{end_sha}']
-            files_output = run_command(diff_cmd, repo_path)
-            commits_info = get_commits_with_files(repo_path, 'sha_range', start_sha=start_sha, end_sha=end_sha)
+            store_diff = get_changed_files_from_store(store, start_sha, end_sha) if store else None
+            if store_diff:
+                files_output = '\n'.join(store_diff[0])
+            else:
+                diff_cmd = ['git', '-c', 'core.quotePath=false', 'diff', '--name-only', f'{start_sha}..{end_sha}']
+                files_output = run_command(diff_cmd, repo_path)
+            commits_info = get_commits_with_files(repo_path, 'sha_range', store=store, start_sha=start_sha, end_sha=end_sha)
             
         elif mode == 'commit_sha':
             commit_sha = params['commit_sha']
             latest_commit_hash = commit_sha
-            show_cmd = ['git', 'show', '--name-only', '--pretty=format:', commit_sha]
+            show_cmd = ['git', '-c', 'core.quotePath=false', 'show', '--name-only', '--pretty=format:', commit_sha]
             files_output = run_command(show_cmd, repo_path)
-            commits_info = get_commits_with_files(repo_path, 'commit_sha', commit_sha=commit_sha)
+            commits_info = get_commits_with_files(repo_path, 'commit_sha', store=store, commit_sha=commit_sha)
         
         if files_output is None:
             return {'error': "Failed to get file list from git. Check your parameters and that git is installed."}
@@ -199,12 +797,163 @@ def get_file_list_preview(params):
         }
     except Exception as e:
         return {'error': str(e)}
+    finally:
+        if store and not shared_store:
+            store.close()
+
+def get_commit_change_entries(repo_path, commit_hash, paths):
+    """
+    Tree entries (path -> (mode, type, oid)) for paths a commit changed, from
+    the long-lived `git diff-tree` process that listed them, so no `ls-tree`
+    runs per commit. Paths the commit deletes are left out. Returns None when
+    the process is unavailable or did not list every path.
+    """
+    changes = git_batch.changed_entries(repo_path, commit_hash)
+    if changes is None or not set(paths) <= set(path for path, _, _ in changes):
+        return None
+    return dict((path, (mode, 'commit' if mode == '160000' else 'blob', oid))
+                for path, mode, oid in changes if mode != '000000')
+
+def write_commit_archive(repo_path, commit, number, archive_name_base, archive_format, store=None,
+                         reproducible=True, log_callback=print, check_cancel=None):
+    """
+    Write one archive of a single commit's changed files as of that commit,
+    named `<base>.<number>-<short sha><ext>`. Returns its series index record,
+    or None if none of the commit's files could be archived.
+    """
+    from archive_writer import ARCHIVE_EXTENSIONS, ArchiveWriter
+    from git_objects import BlobReader
+    commit_hash = commit['hash']
+    files = sorted(set(commit.get('files') or []))
+    archive_path = f"{archive_name_base}.{number:04d}-{commit_hash[:10]}{ARCHIVE_EXTENSIONS.get(archive_format, '.zip')}"
+    tree_entries = None if store else get_commit_change_entries(repo_path, commit_hash, files)
+    if tree_entries is None:
+        tree_entries = get_tree_entries(repo_path, commit_hash, store, paths=files)
+    blob_reader = None
+    if store:
+        try:
+            blob_reader = BlobReader(store, commit_hash)
+        except GitObjectError:
+            pass
+    mtime = get_commit_timestamp(repo_path, commit_hash, store) if reproducible else None
+
+    record = {
+        'number': number,
+        'commit': commit_hash,
+        'author': commit.get('author_name'),
+        'date': commit.get('date'),
+        'message': commit.get('message'),
+        'is_merge': commit.get('is_merge', False),
+        'archive': os.path.basename(archive_path),
+        'files': [],
+        'deleted': []
+    }
+    archive_writer = ArchiveWriter(archive_path, archive_format, mtime=mtime, reproducible=mtime is not None)
+    try:
+        for file_path in files:
+            if check_cancel:
+                check_cancel()
+            if tree_entries is not None and file_path not in tree_entries:
+                record['deleted'].append(file_path)  # Removed by this commit
+                continue
+            added = archive_commit_file(archive_writer, repo_path, commit_hash, file_path,
+                                        tree_entries, blob_reader, log_callback)
+            if added is None:
+                continue
+            digest, entry = added
+            record['files'].append({
+                'path': file_path,
+                'oid': entry[2] if entry else digest.git_oid.hexdigest(),
+                'size': digest.size,
+                'mode': entry[0] if entry else None,
+                'sha256': digest.sha256.hexdigest()
+            })
+        if not record['files']:
+            archive_writer.abort()
+            record['archive'] = None
+            return record
+        archive_writer.close()
+    except BaseException:
+        archive_writer.abort()
+        raise
+    return record
+
+def archive_commit_series(repo_path, mode, range_kwargs, archive_name_base, archive_format, store=None,
+                          jobs=None, reproducible=True, log_callback=print, progress_callback=None,
+                          check_cancel=None):
+    """
+    Patch-series export: one archive per commit in the range (oldest first),
+    each holding that commit's changed files as of that commit. The commit
+    walk happens once; archives are written in parallel and described by a
+    combined `<base>.series.json` index. Returns (index path, commits, records).
+    """
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+    # One walk supplies every commit and its changed files
+    commits = get_commits_with_files(repo_path, mode, store=store, **range_kwargs)
+    commits.reverse()
+    if not commits:
+        log_callback("No commits found in the specified range.")
+        return None
+    jobs = jobs or min(8, os.cpu_count() or 1)
+    log_callback(f"Writing {len(commits)} per-commit archives with {jobs} workers...")
+
+    records = []
+    error = None
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(write_commit_archive, repo_path, commit, number, archive_name_base, archive_format,
+                               store, reproducible, log_callback, check_cancel)
+                   for number, commit in enumerate(commits, 1)]
+        try:
+            for future in futures:
+                records.append(future.result())
+                if progress_callback:
+                    done = len(records)
+                    progress_callback(20 + int(done / len(commits) * 65), f"Archived commit {done}/{len(commits)}")
+        except BaseException as e:
+            for future in futures:
+                future.cancel()
+            error = e
+    if error:
+        # Remove the archives that did get written so no partial series is left behind
+        for future in futures:
+            if not future.cancelled() and future.exception() is None and future.result()['archive']:
+                path = os.path.join(os.path.dirname(archive_name_base), future.result()['archive'])
+                if os.path.exists(path):
+                    os.remove(path)
+        raise error
+
+    index_path = f"{archive_name_base}{SERIES_INDEX_SUFFIX}"
+    index = {
+        'repository': os.path.abspath(repo_path),
+        'mode': mode,
+        'range': range_kwargs,
+        'format': archive_format,
+        'total_commits': len(records),
+        'commits': records
+    }
+    with open(index_path, 'w', encoding='utf-8', newline='\n') as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    for record in records:
+        if record['archive'] is None:
+            log_callback(f"Commit {record['commit'][:10]} has no files to archive; no archive written.")
+    log_callback(f"Created series index: {index_path}")
+    return index_path, commits, records
 
 def archive_git_history(params):
     """
     Main logic for archiving files from a git repository.
     Accepts a dictionary of parameters and a log_callback function.
+    Returns a dictionary of the written output paths on success, otherwise None.
     """
+    from archive_writer import (ARCHIVE_EXTENSIONS, EXECUTABLE_MODE, FILE_MODE, VOLUME_INDEX_SUFFIX, ArchiveWriter,
+                                VolumeWriter, strip_archive_extension)
+    from artifact_cache import DEFAULT_CACHE_BYTES, ArtifactCache
+    from changelog import changelog_info, write_changelogs
+    from large_files import changelog_records
+    from range_planner import plan_lines, plan_range, use_whole_tree
+    import time
+    from manifest import MANIFEST_SUFFIX, ManifestWriter
     log_callback = params.get('log_callback', print) # Default to print for CLI mode
     progress_callback = params.get('progress_callback', None) # Progress callback
     cancel_event = params.get('cancel_event', None) # Threading.Event for cancellation
@@ -212,12 +961,26 @@ def archive_git_history(params):
     output_zip = params['output_zip']
     mode = params['mode']
     archive_format = params.get('archive_format', 'zip')  # Default to zip
+    backend = params.get('backend', 'cli')  # 'cli' or 'python' (in-process object store)
+    # The .txt changelog is always written; other formats are produced in the same pass
+    changelog_formats = ['txt'] + [fmt for fmt in params.get('changelog_formats', []) if fmt != 'txt']
+    # A caller-owned store (e.g. the server's warm repository cache) is used as-is
+    shared_store = params.get('object_store')
+    store = shared_store
+    archive_writer = manifest_writer = None
 
     def check_cancel():
         """Check if cancellation was requested"""
         if cancel_event and cancel_event.is_set():
             raise InterruptedError("Process cancelled by user")
 
+    def explain():
+        """Report the range plan against what actually happened (`--explain`)."""
+        if plan and params.get('explain'):
+            log_callback("")
+            for line in plan_lines(plan):
+                log_callback(line)
+
     try:
         if not os.path.isdir(repo_path) or not os.path.isdir(os.path.join(repo_path, '.git')):
             log_callback(f"Error: Not a valid git repository: '{repo_path}'")
@@ -227,11 +990,20 @@ def archive_git_history(params):
         if progress_callback:
             progress_callback(5, "Validating repository...")
         log_callback(f"Processing repository: {os.path.abspath(repo_path)}")
+        if store:
+            log_callback("Using in-process git object backend (warm cache).")
+        elif backend == 'python':
+            delta_cache_bytes = int(params.get('delta_cache_mb', DEFAULT_DELTA_CACHE_BYTES // (1024 * 1024)) * 1024 * 1024)
+            store = open_object_store(repo_path, log_callback, delta_cache_bytes)
+            if store:
+                log_callback("Using in-process git object backend.")
 
         files_output = None
         latest_commit_hash = None
         changelog_range_info = ""
-        commits_info = []
+        range_kwargs = {}
+        blob_manifest = None
+        plan = None
 
         if mode == 'date':
             check_cancel()
@@ -246,11 +1018,9 @@ def archive_git_history(params):
             if not latest_commit_hash:
                 log_callback(f"Error: Could not find a commit on branch '{branch}' before '{end_date}'.")
                 return
-            log_cmd = ['git', 'log', branch, f'--since="{start_date} 00:00:00"', f'--until="{end_date} 23:59:59"', '--name-only', '--pretty=format:']
-            files_output = run_command(log_cmd, repo_path)
-            check_cancel()
-            # Get commit details with files for date range
-            commits_info = get_commits_with_files(repo_path, 'date', branch=branch, start_date=start_date, end_date=end_date)
+            # Commits and their files are streamed into the changelog later
+            range_kwargs = {'branch': branch, 'start_date': start_date, 'end_date': end_date}
+            plan = plan_range(repo_path, mode, range_kwargs, latest_commit_hash, store, params.get('date_tree_diff'))
 
         elif mode == 'sha_range':
             check_cancel()
@@ -260,12 +1030,9 @@ def archive_git_history(params):
             range_display = f"{start_sha[:7]}..{end_sha[:7]}"
             changelog_range_info = f"SHA Range: {range_display}"
             log_callback(f"Mode: SHA Range {range_display}")
-            latest_commit_hash = end_sha
-            diff_cmd = ['git', 'diff', '--name-only', f'{start_sha}..{end_sha}']
-            files_output = run_command(diff_cmd, repo_path)
-            check_cancel()
-            # Get commit details with files for SHA range
-            commits_info = get_commits_with_files(repo_path, 'sha_range', start_sha=start_sha, end_sha=end_sha)
+            latest_commit_hash = (resolve_commit(repo_path, end_sha, store) if store else None) or end_sha
+            range_kwargs = {'start_sha': start_sha, 'end_sha': end_sha}
+            plan = plan_range(repo_path, mode, range_kwargs, latest_commit_hash, store)
 
         elif mode == 'commit_sha':
             check_cancel()
@@ -275,12 +1042,69 @@ def archive_git_history(params):
             range_display = f"Single Commit: {commit_sha[:7]}"
             changelog_range_info = f"Commit: {commit_sha}"
             log_callback(f"Mode: {range_display}")
-            latest_commit_hash = commit_sha
-            show_cmd = ['git', 'show', '--name-only', '--pretty=format:', commit_sha]
-            files_output = run_command(show_cmd, repo_path)
+            latest_commit_hash = (resolve_commit(repo_path, commit_sha, store) if store else None) or commit_sha
+            range_kwargs = {'commit_sha': commit_sha}
+            plan = plan_range(repo_path, mode, range_kwargs, latest_commit_hash, store)
+
+        # Remove extension from output_zip if present, we'll add the correct one
+        archive_name_base = strip_archive_extension(output_zip)
+        # Like shutil.make_archive, create the output directory if needed
+        os.makedirs(os.path.dirname(os.path.abspath(archive_name_base)), exist_ok=True)
+        if params.get('per_commit'):
+            # Each commit's archive holds its own files, so the range's file set is never needed
+            if plan['strategy'] == 'tree-diff':
+                plan['strategy'] = 'log-walk'
+                plan['reasons'] = ["per-commit: every commit's files come from one walk of the range"]
+            ignored = [option for option, used in (
+                ('--patches', params.get('patches')),
+                ('--max-volume-mb', params.get('max_volume_mb')),
+                ('--cache-dir', params.get('artifact_cache_dir')),
+                ('--large-file-mb', params.get('large_file_mb')),
+                ('--lfs resolve', params.get('lfs') == 'resolve')) if used]
+            if ignored:
+                log_callback(f"Note: {', '.join(ignored)} apply to single-archive exports and are ignored "
+                             f"with --per-commit.")
+            series = archive_commit_series(repo_path, mode, range_kwargs, archive_name_base, archive_format, store,
+                                           params.get('jobs'), params.get('reproducible', True), log_callback,
+                                           progress_callback, check_cancel)
+            if series is None:
+                explain()
+                return
+            index_path, commits, records = series
+            archives = [os.path.join(os.path.dirname(archive_name_base), record['archive'])
+                        for record in records if record['archive']]
+            archived_files = sorted(set(entry['path'] for record in records for entry in record['files']))
+            plan['actual'].update(commits=len(commits), files=len(archived_files))
             check_cancel()
-            # Get commit details with files for single commit
-            commits_info = get_commits_with_files(repo_path, 'commit_sha', commit_sha=commit_sha)
+            if progress_callback:
+                progress_callback(85, "Creating changelog file...")
+            # The changelog covers the whole range, newest commit first as in `git log`
+            info = changelog_info(archive_name_base, SERIES_INDEX_SUFFIX, repo_path, changelog_range_info,
+                                  len(archived_files), len(commits))
+            written = write_changelogs(archive_name_base, changelog_formats, info, reversed(commits), archived_files)
+            if progress_callback:
+                progress_callback(100, "Process complete!")
+            explain()
+            log_callback("\n--- PROCESS COMPLETE ---")
+            return {
+                'plan': plan,
+                'archive': index_path,
+                'archives': archives,
+                'changelogs': written,
+                'commit_hash': commits[-1]['hash'],
+                'total_files': len(archived_files)
+            }
+
+        resolve_started = time.perf_counter()
+        if mode == 'date':
+            files_output, blob_manifest = get_date_range_files(repo_path, plan, range_kwargs, store)
+        elif mode == 'sha_range':
+            files_output, blob_manifest = get_tree_diff_files(repo_path, range_kwargs['start_sha'],
+                                                              range_kwargs['end_sha'], store)
+        elif mode == 'commit_sha':
+            show_cmd = ['git', '-c', 'core.quotePath=false', 'show', '--name-only', '--pretty=format:',
+                        range_kwargs['commit_sha']]
+            files_output = run_command(show_cmd, repo_path)
 
         if files_output is None:
             log_callback("Error: Failed to get file list from git. Check your parameters and that git is installed.")
@@ -290,147 +1114,372 @@ def archive_git_history(params):
         # Split lines and filter out empty strings
         all_files = files_output.splitlines()
         changed_files = sorted(list(set([f.strip() for f in all_files if f.strip()])))
+        plan['actual'].update(files=len(changed_files), resolve_seconds=time.perf_counter() - resolve_started)
+        if blob_manifest:
+            # File list and blob manifest came from a single in-process tree-diff pass
+            log_callback(f"Computed {len(changed_files)} changed paths in-process.")
         if not changed_files:
             log_callback("No files changed in the specified range or commit.")
+            explain()
             return
             
-        log_callback(f"Found {len(changed_files)} unique files.")
+        log_callback(f"Found {len(changed_files)} unique files ({plan['strategy']}).")
+
         log_callback(f"Using state of files from commit: {latest_commit_hash[:10]}")
+        archive_ext = ARCHIVE_EXTENSIONS.get(archive_format, '.zip')
+        # Split output writes <base>.partNNN<ext> volumes plus a .volumes.json index
+        max_volume_bytes = int(float(params.get('max_volume_mb') or 0) * 1024 * 1024)
+        archive_path = f"{archive_name_base}{VOLUME_INDEX_SUFFIX if max_volume_bytes else archive_ext}"
+        manifest_path = f"{archive_name_base}{MANIFEST_SUFFIX}"
+
+        artifact_cache = cache_key = None
+        if params.get('artifact_cache_dir') and max_volume_bytes:
+            log_callback("Note: Artifact cache is not used for split archives.")
+        elif params.get('artifact_cache_dir'):
+            cache_bytes = int((params.get('artifact_cache_mb') or DEFAULT_CACHE_BYTES // (1024 * 1024)) * 1024 * 1024)
+            artifact_cache = ArtifactCache(params['artifact_cache_dir'], cache_bytes)
+            cache_key = export_cache_key(repo_path, params, store, latest_commit_hash, changed_files,
+                                         archive_format, changelog_formats, changelog_range_info)
+            cached = artifact_cache.fetch(cache_key, archive_name_base, archive_ext) if cache_key else None
+            if cached:
+                log_callback(f"Served from artifact cache: {cached['archive']}")
+                if progress_callback:
+                    progress_callback(100, "Process complete!")
+                explain()
+                log_callback("\n--- PROCESS COMPLETE ---")
+                return {
+                    'plan': plan,
+                    'archive': cached['archive'],
+                    'manifest': cached['manifest'],
+                    'changelogs': cached['changelogs'],
+                    'commit_hash': latest_commit_hash,
+                    'total_files': cached['info'].get('total_files'),
+                    'cached': True
+                }
 
         check_cancel()
         if progress_callback:
-            progress_callback(20, "Creating temporary directory...")
-        temp_dir = tempfile.mkdtemp(prefix="git-archive-")
-        log_callback(f"Created temporary directory: {temp_dir}")
+            format_name = {'zip': 'ZIP', 'tar': 'TAR', 'gztar': 'TAR.GZ'}.get(archive_format, 'ZIP')
+            progress_callback(20, f"Creating {format_name} archive...")
+        log_callback(f"Creating {archive_format.upper()} archive: {archive_path}")
+        # Files are streamed straight into the archive; the manifest's SHA-256
+        # and blob OIDs are computed from the same bytes as they are written.
+        # Reproducible output stamps every entry with the commit time so the
+        # same range always yields byte-identical archives.
+        mtime = None
+        if params.get('reproducible', True):
+            mtime = get_commit_timestamp(repo_path, latest_commit_hash, store)
+        if max_volume_bytes:
+            log_callback(f"Splitting into volumes of at most {max_volume_bytes / (1024 * 1024):.1f} MB")
+            archive_writer = VolumeWriter(archive_name_base, archive_format, max_volume_bytes,
+                                          mtime=mtime, reproducible=mtime is not None)
+        else:
+            archive_writer = ArchiveWriter(archive_path, archive_format, mtime=mtime, reproducible=mtime is not None)
+        manifest_writer = ManifestWriter(manifest_path, {
+            'archive': os.path.basename(archive_path),
+            'format': archive_format,
+            'repository': os.path.abspath(repo_path),
+            'commit': latest_commit_hash
+        })
+
+        blob_reader = None
+        if store:
+            try:
+                blob_reader = store.blob_reader(latest_commit_hash)
+                if blob_manifest:
+                    blob_reader.add_entries(blob_manifest.values())
+            except GitObjectError as e:
+                log_callback(f"Warning: In-process blob reads unavailable ({e}). Using git CLI.")
+
+        # One tree listing supplies mode, type and OID for every path, so
+        # executable bits and symlinks survive without per-file git calls.
+        tree_entries = get_tree_entries(repo_path, latest_commit_hash, store)
+        if tree_entries is None:
+            log_callback("Warning: Could not list the commit tree. File modes will not be preserved.")
+
+        # Large-file and LFS decisions come from one batch of blob sizes,
+        # before any file content is read
+        large_files = plan_large_file_handling(repo_path, changed_files, tree_entries, store, params)
+        excluded = set(path for path, decision in large_files.items() if decision['action'] in ('skip', 'list'))
+        uncompressed = set(path for path, decision in large_files.items() if decision['action'] == 'store')
+        lfs_objects = dict((path, decision['lfs_object']) for path, decision in large_files.items()
+                           if decision['lfs_object'] and path not in excluded)
+        for path, decision in sorted(large_files.items()):
+            log_callback(f"Large file '{path}': {decision['note']}.")
+        if uncompressed and archive_format == 'gztar':
+            log_callback("Note: .tar.gz compresses the whole stream; large files cannot be stored uncompressed.")
 
         archived_files = []
         total_files = len(changed_files)
-        for idx, file_path in enumerate(changed_files):
+        done_paths = set()
+
+        def add_per_blob(idx, file_path):
+            """Archive one path from its blob (or its resolved LFS object)."""
             check_cancel()
             if progress_callback:
-                progress = 20 + int((idx / total_files) * 50)  # 20-70% for file archiving
+                progress = 20 + int((idx / total_files) * 65)  # 20-85% for file archiving
                 progress_callback(progress, f"Archiving file {idx+1}/{total_files}: {file_path[:50]}...")
+            done_paths.add(file_path)
             if not file_path:
-                continue
-            dest_path = os.path.join(temp_dir, file_path)
-            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-            show_cmd = ['git', 'show', f'{latest_commit_hash}:{file_path}']
-            try:
-                startupinfo = None
-                if os.name == 'nt':
-                    startupinfo = subprocess.STARTUPINFO()
-                    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                with open(dest_path, 'wb') as f:
-                    content = subprocess.run(show_cmd, cwd=repo_path, check=True, capture_output=True, startupinfo=startupinfo).stdout
-                    f.write(content)
+                return
+            if file_path in lfs_objects:
+                # The LFS object's content replaces the pointer; its manifest OID is that of the content
+                entry = tree_entries[file_path]
+                with open(lfs_objects[file_path], 'rb') as lfs_file:
+                    digest = archive_writer.add_file(file_path, lfs_file, size=large_files[file_path]['size'],
+                                                     mode=EXECUTABLE_MODE if entry[0] == '100755' else FILE_MODE,
+                                                     compress=file_path not in uncompressed)
+                manifest_writer.add(file_path, digest, mode=entry[0])
+                archived_files.append(file_path)
+                return
+            added = archive_commit_file(archive_writer, repo_path, latest_commit_hash, file_path,
+                                        tree_entries, blob_reader, log_callback, file_path not in uncompressed)
+            if added is None:
+                return
+            digest, entry = added
+            manifest_writer.add(file_path, digest, mode=entry[0] if entry else None, oid=entry[2] if entry else None)
+            archived_files.append(file_path)
+
+        # Fast path: blobs come from chunked `git archive` streams, one process
+        # per chunk instead of one `git show` per file. Whatever it does not
+        # deliver (gitlinks, LFS objects, missing paths, a failed chunk) goes
+        # through add_per_blob(), merged in path order so the archive is the
+        # same whichever way its entries were read.
+        extraction = {'path': 'per-blob', 'reason': None, 'git_processes': 0, 'fallback_reason': None}
+        extraction['reason'] = git_archive_blocker(repo_path, tree_entries, store, params)
+        if extraction['reason'] is None:
+            extraction['path'] = 'git-archive'
+            blob_paths = [path for path in changed_files if path in tree_entries and tree_entries[path][1] == 'blob'
+                          and path not in excluded and path not in lfs_objects]
+            streamed = set(blob_paths)
+            per_blob = [(idx, path) for idx, path in enumerate(changed_files)
+                        if path not in streamed and path not in excluded]
+            per_blob.reverse()  # Popped from the end, smallest path first
+
+            def before_member(name):
+                # `git archive` emits members in path order, as changed_files is sorted
+                while per_blob and per_blob[-1][1] < name:
+                    add_per_blob(*per_blob.pop())
+
+            fast_count = 0
+            for file_path, (digest, entry) in iter_git_archive_files(archive_writer, repo_path, latest_commit_hash,
+                                                                     blob_paths, tree_entries, extraction,
+                                                                     uncompressed,
+                                                                     use_whole_tree(plan, len(blob_paths), tree_entries),
+                                                                     before_member):
+                check_cancel()
+                if progress_callback:
+                    progress = 20 + int((len(done_paths) / total_files) * 65)  # 20-85% for file archiving
+                    progress_callback(progress, f"Archiving file {len(done_paths)+1}/{total_files}: {file_path[:50]}...")
+                manifest_writer.add(file_path, digest, mode=entry[0], oid=entry[2])
                 archived_files.append(file_path)
-            except subprocess.CalledProcessError:
-                log_callback(f"Warning: Could not find '{file_path}' in commit {latest_commit_hash[:10]}. Skipping.")
+                done_paths.add(file_path)
+                fast_count += 1
+            log_callback(f"Extraction: git archive fast path, {fast_count} files from "
+                         f"{extraction['git_processes']} git process(es).")
+            if extraction['fallback_reason']:
+                log_callback(f"Warning: {extraction['fallback_reason']}; remaining files use per-blob extraction.")
+        else:
+            plan['extraction'] = f"per-blob ({extraction['reason']})"
+            if tree_entries is not None:
+                plan['actual']['tree_entries'] = len(tree_entries)
+            log_callback(f"Extraction: per-blob ({extraction['reason']}).")
+
+        # Everything after the last streamed member, including the rest of a failed stream
+        for idx, file_path in enumerate(changed_files):
+            if file_path in done_paths or file_path in excluded:
+                continue
+            add_per_blob(idx, file_path)
         
+        if blob_reader:
+            log_callback(f"Blob reader: {blob_reader.stats()}")
+
         check_cancel()
         if not archived_files:
             log_callback("No files could be archived. Aborting.")
-            shutil.rmtree(temp_dir)
             return
 
-        if progress_callback:
-            format_name = {'zip': 'ZIP', 'tar': 'TAR', 'gztar': 'TAR.GZ'}.get(archive_format, 'ZIP')
-            progress_callback(70, f"Creating {format_name} archive...")
-        
-        # Remove extension from output_zip if present, we'll add the correct one
-        archive_name_base = output_zip
-        for ext in ['.zip', '.tar', '.tar.gz', '.gz']:
-            if archive_name_base.lower().endswith(ext):
-                archive_name_base = archive_name_base[:-len(ext)]
-                break
-        
-        # Map format to extension for changelog
-        format_ext_map = {'zip': '.zip', 'tar': '.tar', 'gztar': '.tar.gz'}
-        archive_ext = format_ext_map.get(archive_format, '.zip')
-        
-        log_callback(f"Creating {archive_format.upper()} archive: {archive_name_base}{archive_ext}")
-        shutil.make_archive(archive_name_base, archive_format, temp_dir)
-        log_callback(f"Successfully created {archive_format.upper()} archive.")
-
         check_cancel()
         if progress_callback:
             progress_callback(85, "Creating changelog file...")
         changelog_path = f"{archive_name_base}.txt"
         log_callback(f"Creating changelog file: {changelog_path}")
-        with open(changelog_path, 'w', encoding='utf-8') as f:
-            f.write(f"Changelog for {os.path.basename(archive_name_base)}{archive_ext}\n")
-            f.write("="*70 + "\n")
-            f.write(f"Repository: {os.path.abspath(repo_path)}\n")
-            f.write(changelog_range_info + "\n")
-            f.write(f"Total Files Archived: {len(archived_files)}\n")
-            f.write("="*70 + "\n\n")
-            
-            # Write commit information with their files
-            if commits_info:
-                f.write(f"Commits with Changed Files ({len(commits_info)}):\n")
-                f.write("="*70 + "\n")
-                
-                total_commit_files = 0
-                for i, commit in enumerate(commits_info, 1):
-                    # Filter files that were actually archived
-                    commit_archived_files = [f for f in commit.get('files', []) if f in archived_files]
-                    total_commit_files += len(commit_archived_files)
-                    
-                    commit_type = " [MERGE]" if commit.get('is_merge', False) else ""
-                    f.write(f"\n[{i}] Commit: {commit['hash'][:10]}{commit_type}\n")
-                    f.write(f"    Author: {commit['author_name']} <{commit['author_email']}>\n")
-                    f.write(f"    Date: {commit['date']}\n")
-                    f.write(f"    Message: {commit['message']}\n")
-                    
-                    if commit.get('is_merge', False):
-                        f.write(f"    Type: Merge Commit\n")
-                        if not commit_archived_files:
-                            f.write(f"    Note: Merge commits may not show direct file changes\n")
-                    
-                    f.write(f"    Files Changed ({len(commit_archived_files)}):\n")
-                    
-                    if commit_archived_files:
-                        for file_path in sorted(commit_archived_files):
-                            f.write(f"      - {file_path}\n")
-                    else:
-                        if commit.get('is_merge', False):
-                            f.write(f"      (Merge commit - files may have been changed in merged branches)\n")
+        commit_count = plan['estimate']['commits']  # Counted exactly by the planner
+        info = changelog_info(archive_name_base, archive_path[len(archive_name_base):], repo_path, changelog_range_info,
+                              len(archived_files), commit_count, changelog_records(large_files))
+
+        plan['actual']['commits'] = 0
+
+        def on_commit(index):
+            plan['actual']['commits'] = index
+            check_cancel()
+            if progress_callback and commit_count:
+                progress = 85 + int((min(index, commit_count) / commit_count) * 14)  # 85-99% for the changelog
+                progress_callback(progress, f"Writing changelog: commit {index}/{commit_count}...")
+
+        def add_patch(name, patch):
+            if patch is None:
+                log_callback(f"Warning: Could not create patch '{name}'.")
+                return
+            digest = archive_writer.add_file(PATCH_PREFIX + name, patch)
+            manifest_writer.add(PATCH_PREFIX + name, digest)
+
+        walked = []
+
+        def with_patches(commits):
+            """Stream each walked commit's patch into the archive as the changelog consumes it."""
+            number = patch_count
+            patches = None
+            if patch_mode == 'commit':
+                patches = PatchStream(repo_path, commit_range_args(mode, **range_kwargs))
+            try:
+                for commit in commits:
+                    walked.append(commit['hash'])
+                    if patches:
+                        if commit.get('is_merge'):
+                            log_callback(f"Skipping patch for merge commit {commit['hash'][:10]}.")
                         else:
-                            f.write(f"      (No files from this commit were archived)\n")
-                    f.write("-" * 60 + "\n")
-                    
-                f.write(f"\nSummary:\n")
-                f.write(f"- Total commits: {len(commits_info)}\n")
-                f.write(f"- Total unique files archived: {len(archived_files)}\n")
-                f.write(f"- Total file changes across all commits: {total_commit_files}\n")
+                            add_patch(patch_file_name(number, commit.get('message')), patches.patch(commit['hash']))
+                            number -= 1
+                    yield commit
+            finally:
+                if patches:
+                    patches.close()
+
+        patch_mode = params.get('patches')
+        patch_count = 0
+        if patch_mode == 'commit' and commit_count:
+            # Commits arrive newest first; merges get no patch, so the series is
+            # numbered 1..N over the non-merge commits, oldest first like `git format-patch`
+            count = run_command(['git', 'rev-list', '--count', '--no-merges'] + commit_range_args(mode, **range_kwargs),
+                                repo_path)
+            patch_count = int(count) if count and count.isdigit() else commit_count
+        if patch_mode and any(path.startswith(PATCH_PREFIX) for path in archived_files):
+            log_callback(f"Warning: Repository files under '{PATCH_PREFIX}' share the prefix used for patches.")
+        # Commits are fetched lazily and rendered to every format in one pass
+        commits = iter_commits_with_files(repo_path, mode, store=store, **range_kwargs) if commit_count else []
+        if patch_mode:
+            commits = with_patches(commits)
+        written = write_changelogs(archive_name_base, changelog_formats, info, commits, archived_files, on_commit)
+        if patch_mode == 'range' and walked:
+            if mode == 'sha_range':
+                base = range_kwargs['start_sha']
             else:
-                # Fallback for when no commit info is available
-                f.write(f"Archived Files ({len(archived_files)}):\n")
-                f.write("-" * 50 + "\n")
-                for file_path in sorted(archived_files):
-                    f.write(f"{file_path}\n")
+                # Parent of the oldest walked commit, or the empty tree for a root commit
+                base = run_command(['git', 'rev-parse', '--verify', '--quiet', f'{walked[-1]}^'], repo_path) or EMPTY_TREE_SHA
+            base = resolve_commit(repo_path, base, store) or base
+            end = resolve_commit(repo_path, latest_commit_hash, store) or latest_commit_hash
+            add_patch(f"{base[:7]}..{end[:7]}.patch", format_range_patch(repo_path, base, end))
+        if patch_mode:
+            log_callback(f"Added {'per-commit' if patch_mode == 'commit' else 'cumulative'} patches under '{PATCH_PREFIX}'.")
+        for path in written[1:]:
+            log_callback(f"Created additional changelog: {path}")
+        log_callback("Successfully created changelog file.")
+
+        # The archive stays open through the commit walk so patches land in it
+        archive_writer.close()
+        manifest_writer.close()
+        volumes = None
+        if max_volume_bytes:
+            volumes = [volume['path'] for volume in archive_writer.volumes]
+            for path in archive_writer.oversized:
+                log_callback(f"Warning: '{path}' alone exceeds the volume size limit; its volume is larger.")
+            log_callback(f"Wrote {len(volumes)} volumes; path index: {archive_path}")
+        archive_writer = manifest_writer = None
+        log_callback(f"Successfully created {archive_format.upper()} archive.")
+        log_callback(f"Created manifest: {manifest_path}")
         if progress_callback:
             progress_callback(100, "Process complete!")
-        log_callback("Successfully created changelog file.")
+        if artifact_cache and cache_key:
+            try:
+                artifact_cache.store(cache_key, archive_name_base, archive_path, manifest_path, written,
+                                     {'total_files': len(archived_files)})
+            except OSError as e:
+                log_callback(f"Warning: Could not store export in artifact cache ({e}).")
+        explain()
         log_callback("\n--- PROCESS COMPLETE ---")
+        result = {
+            'plan': plan,
+            'archive': archive_path,
+            'manifest': manifest_path,
+            'changelogs': written,
+            'commit_hash': latest_commit_hash,
+            'total_files': len(archived_files),
+            'extraction': extraction,
+            'large_files': changelog_records(large_files)
+        }
+        if volumes:
+            result['volumes'] = volumes
+        return result
 
     except InterruptedError as e:
         log_callback(f"\n--- PROCESS CANCELLED ---")
         log_callback(str(e))
         if progress_callback:
             progress_callback(0, "Cancelled")
+    except GitObjectError as e:
+        log_callback(f"\nError: The in-process object backend failed part-way through the range ({e}).")
+        log_callback("Re-run with --backend cli to read the repository through git.")
+        if progress_callback:
+            progress_callback(0, "Error occurred")
     except Exception as e:
         log_callback(f"\nAn unexpected error occurred: {e}")
         if progress_callback:
             progress_callback(0, "Error occurred")
     finally:
-        if 'temp_dir' in locals() and os.path.exists(temp_dir):
-            log_callback(f"Cleaning up temporary directory: {temp_dir}")
-            shutil.rmtree(temp_dir)
+        if store and not shared_store:
+            store.close()
+        # Discard partial outputs if we did not get as far as closing them
+        if archive_writer:
+            archive_writer.abort()
+        if manifest_writer:
+            manifest_writer.abort()
+
+def verify_main(argv):
+    """CLI entry point for `git_archive_by_date.py verify <archive>`."""
+    import argparse
+    from manifest import verify_archive
+    parser = argparse.ArgumentParser(
+        prog="git_archive_by_date.py verify",
+        description="Verify an archive's contents against its manifest (size and SHA-256 of every entry).",
+        epilog="Created by ekosiswoyo"
+    )
+    parser.add_argument("archive", help="Path to the .zip, .tar or .tar.gz archive, or the .volumes.json index of a split archive.")
+    parser.add_argument("-m", "--manifest", help="Manifest path (default: <archive base>.manifest.json).")
+    parser.add_argument("-j", "--jobs", type=int, help="Number of parallel hashing workers.")
+    parser.add_argument(startup_profile.PROFILE_FLAG, action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.profile_startup:
+        startup_profile.report("verify ready", startup_profile.CLI_BUDGET_MS)
+
+    if not os.path.isfile(args.archive):
+        parser.error(f"archive not found: '{args.archive}'")
+    result = verify_archive(args.archive, args.manifest, args.jobs)
+    sys.exit(0 if result['ok'] else 1)
 
 def main():
+    import argparse
+    from datetime import datetime
+    from changelog import CHANGELOG_FORMATS
+    from large_files import LARGE_FILE_POLICIES, LFS_MODES
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'verify':
+        verify_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        import archive_server
+        archive_server.main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == 'watch':
+        import archive_watch
+        archive_watch.main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
-        description="Archive files from a Git repository based on a date range, commit range, or a single commit.",
+        description="Archive files from a Git repository based on a date range, commit range, or a single commit.\n"
+                    "Use 'git_archive_by_date.py verify <archive>' to check an archive against its manifest,\n"
+                    "'git_archive_by_date.py serve' to run a local archive service,\n"
+                    "or 'git_archive_by_date.py watch' to archive new commits on a branch as they land.",
         formatter_class=argparse.RawTextHelpFormatter,
         epilog="Created by ekosiswoyo"
     )
@@ -445,11 +1494,74 @@ def main():
     group.add_argument("--end-sha", help="The ending commit SHA for the range.")
     group.add_argument("--commit-sha", help="The single commit SHA to archive changes from.")
 
+    parser.add_argument("--backend", choices=['cli', 'python'], default='cli',
+                        help="How git objects are read: 'cli' forks git (default), 'python' reads\n"
+                             "loose objects and packfiles in-process, falling back to the CLI.")
+    parser.add_argument("--changelog-format", action='append', choices=CHANGELOG_FORMATS, default=[],
+                        help="Additional changelog format to write next to the .txt changelog.\n"
+                             "May be given more than once (e.g. --changelog-format md --changelog-format json).")
+    parser.add_argument("--per-commit", action='store_true',
+                        help="Write one archive per commit in the range (each with that commit's changed files\n"
+                             "as of that commit) plus a combined <name>.series.json index.")
+    parser.add_argument("-j", "--jobs", type=int, help="Parallel workers for --per-commit (default: CPU count, max 8).")
+    parser.add_argument("--patches", choices=PATCH_MODES,
+                        help="Also add unified diffs under patches/ in the archive: one per commit\n"
+                             "('commit', format-patch style) or one for the whole range ('range').")
+    parser.add_argument("--max-volume-mb", type=float,
+                        help="Split the archive into independently extractable volumes of at most this size,\n"
+                             "plus a <name>.volumes.json index mapping each path to its volume.")
+    parser.add_argument("--large-file-mb", type=float,
+                        help="Apply --large-file-policy to files larger than this size (sizes are read\n"
+                             "in one batch before any content). Decisions are recorded in the changelog.")
+    parser.add_argument("--large-file-policy", choices=LARGE_FILE_POLICIES, default='store',
+                        help="What to do with large files: 'skip' them, 'store' them uncompressed\n"
+                             "(default), or 'list' them in the changelog without archiving them.")
+    parser.add_argument("--lfs", choices=LFS_MODES, default='keep',
+                        help="Git LFS pointer files: 'keep' archives the pointers (default), 'resolve'\n"
+                             "archives the real content from the local .git/lfs object store.")
+    parser.add_argument("--explain", action='store_true',
+                        help="Report how the range was resolved (log walk, tree diff or single commit) and the\n"
+                             "planner's estimates of commits, tree size and changed files next to the actual numbers.")
+    parser.add_argument("--date-tree-diff", action='store_true',
+                        help="For a date range, let the planner compare the trees at both ends of the window when\n"
+                             "that is cheaper. Only net changes are archived: a file changed and then reverted\n"
+                             "inside the window is left out.")
+    parser.add_argument("--no-git-archive", dest='git_archive', action='store_false',
+                        help="Always read files one blob at a time instead of through chunked `git archive` streams.")
+    parser.add_argument("--no-reproducible", dest='reproducible', action='store_false',
+                        help="Stamp archive entries with the current time instead of the commit time.")
+    parser.add_argument("--cache-dir", help="Artifact cache directory. Repeat exports of the same resolved range\n"
+                                           "are served from it by hard link instead of being rebuilt.")
+    parser.add_argument("--cache-max-mb", type=int,
+                        help="Disk budget of the artifact cache; least recently used exports are evicted (default: 1024).")
+    parser.add_argument("--delta-cache-mb", type=int, default=DEFAULT_DELTA_CACHE_BYTES // (1024 * 1024),
+                        help="Size limit of the resolved delta-base cache for --backend python (default: %(default)s).")
+    parser.add_argument(startup_profile.PROFILE_FLAG, action='store_true',
+                        help="Report start-up time (imports and argument parsing) against its budget on stderr.")
+
     args = parser.parse_args()
+    if args.profile_startup:
+        startup_profile.report("CLI ready", startup_profile.CLI_BUDGET_MS)
 
     params = {
         'repo_path': args.repo_path,
         'output_zip': args.output_zip,
+        'backend': args.backend,
+        'delta_cache_mb': args.delta_cache_mb,
+        'changelog_formats': args.changelog_format,
+        'patches': args.patches,
+        'per_commit': args.per_commit,
+        'jobs': args.jobs,
+        'max_volume_mb': args.max_volume_mb,
+        'large_file_mb': args.large_file_mb,
+        'large_file_policy': args.large_file_policy,
+        'lfs': args.lfs,
+        'explain': args.explain,
+        'date_tree_diff': args.date_tree_diff,
+        'reproducible': args.reproducible,
+        'git_archive': args.git_archive,
+        'artifact_cache_dir': args.cache_dir,
+        'artifact_cache_mb': args.cache_max_mb,
     }
 
     is_date_mode = bool(args.start_date or args.end_date)
@@ -0,0 +1,229 @@
+import os
+import atexit
+import threading
+import subprocess
+
+# Long-lived git processes that answer many queries each, instead of one
+# process per file or per commit. Spawning is cheap on Linux but 10-50x
+# slower on Windows, where the per-file `git show` and per-commit
+# `git cat-file -p` calls dominated an export.
+#
+#   git cat-file --batch          object contents by name (`<commit>:<path>`, OIDs)
+#   git cat-file --batch-check    object OID, type and size by name (`<rev>^{commit}`)
+#   git diff-tree --stdin         changed paths per commit, in `git show` semantics,
+#                                 with the mode and OID each path has in the commit
+#
+# Each process is started on first use and kept per repository until exit.
+# git reads refs from disk for every query, so a branch moved by a later
+# commit resolves to its new tip without restarting anything.
+# Queries are serialised per process, so the helpers are safe to call from
+# worker threads. Answers are read back one query at a time, which is why
+# `git rev-list --stdin` is not used here: it reads all of its input before
+# producing any output.
+#
+# Set GIT_ARCHIVE_PROCESS_REUSE=0 to go back to one git process per call.
+
+ENABLED = os.environ.get('GIT_ARCHIVE_PROCESS_REUSE', '1') != '0'
+# diff-tree echoes (and flushes) any input line that is not an object name;
+# the echo marks the end of the answer for the commit before it
+DIFF_TREE_SENTINEL = '--end-of-commit--'
+
+_repos = {}
+_repos_lock = threading.Lock()
+spawn_count = 0  # Processes started by this module, for benchmarks
+
+
+class BatchProcess:
+    """One git process that reads queries on stdin and answers each on stdout."""
+
+    def __init__(self, repo_path, args):
+        self.repo_path = repo_path
+        self.args = args
+        self.process = None
+        self.lock = threading.Lock()
+
+    def _ensure_started(self):
+        global spawn_count
+        if self.process is not None and self.process.poll() is None:
+            return self.process
+        startupinfo = None
+        if os.name == 'nt':
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        self.process = subprocess.Popen(['git'] + self.args, cwd=self.repo_path, stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, startupinfo=startupinfo)
+        spawn_count += 1
+        return self.process
+
+    def ask(self, line, read_answer):
+        """Send one query line and return read_answer(stdout), or None if the process died."""
+        with self.lock:
+            try:
+                process = self._ensure_started()
+                process.stdin.write(line.encode('utf-8', errors='surrogateescape') + b'\n')
+                process.stdin.flush()
+                return read_answer(process.stdout)
+            except (OSError, ValueError):
+                self.close()
+                return None
+
+    def close(self):
+        process, self.process = self.process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=5)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            process.kill()
+        finally:
+            process.stdout.close()
+
+
+def _read_object(stdout):
+    header = stdout.readline().decode('utf-8', errors='surrogateescape').rstrip('\n')
+    parts = header.split(' ')
+    if len(parts) != 3 or not parts[2].isdigit():
+        return False  # "<name> missing" / "<name> ambiguous"
+    size = int(parts[2])
+    data = stdout.read(size + 1)[:size]  # Content is followed by a newline
+    return parts[0], parts[1], data
+
+
+def _read_info(stdout):
+    parts = stdout.readline().decode('utf-8', errors='surrogateescape').split()
+    if len(parts) != 3 or not parts[2].isdigit():
+        return False
+    return parts[0], parts[1], int(parts[2])
+
+
+def _parse_changes(data):
+    """
+    Parse NUL-separated raw diff records up to the echoed sentinel into
+    (path, mode, oid) tuples, or return None if the answer is incomplete.
+    """
+    fields = data.split(b'\0')
+    changes = []
+    index = 0
+    while index < len(fields) - 1:
+        meta = fields[index]
+        parents = len(meta) - len(meta.lstrip(b':'))
+        if not parents:
+            return None
+        values = meta[parents:].split(b' ')
+        # Renames and copies list the old and the new path; combined diffs list one
+        paths = 2 if parents == 1 and values[-1][:1] in (b'R', b'C') else 1
+        if index + paths >= len(fields) - 1:
+            return None
+        path = fields[index + paths].decode('utf-8', errors='surrogateescape')
+        changes.append((path, values[parents].decode('ascii'), values[2 * parents + 1].decode('ascii')))
+        index += paths + 1
+    if fields[index] != DIFF_TREE_SENTINEL.encode('ascii') + b'\n':
+        return None
+    return changes
+
+
+def _read_changes(stdout):
+    # Paths are NUL-terminated (-z) but the sentinel echo ends with a newline,
+    # so read lines until the records parse up to the sentinel
+    data = b''
+    for raw in iter(stdout.readline, b''):
+        data += raw
+        changes = _parse_changes(data)
+        if changes is not None:
+            return changes
+    return None  # The process exited mid-answer
+
+
+class RepoProcesses:
+    """The long-lived git processes of one repository."""
+
+    def __init__(self, repo_path):
+        self.repo_path = repo_path
+        self.cat_file = BatchProcess(repo_path, ['cat-file', '--batch'])
+        self.cat_file_check = BatchProcess(repo_path, ['cat-file', '--batch-check'])
+        # -M and --cc give the rename-aware, combined-diff file lists of `git show --name-only`;
+        # --raw -z adds each path's new mode and OID, with paths unquoted
+        self.diff_tree = BatchProcess(repo_path, ['diff-tree', '--stdin', '-r', '--raw', '-z',
+                                                  '--no-commit-id', '--root', '--cc', '-M'])
+
+    def close(self):
+        for process in (self.cat_file, self.cat_file_check, self.diff_tree):
+            process.close()
+
+
+def for_repo(repo_path):
+    """The shared RepoProcesses of a repository, or None when reuse is disabled."""
+    if not ENABLED:
+        return None
+    key = os.path.realpath(repo_path)
+    with _repos_lock:
+        processes = _repos.get(key)
+        if processes is None:
+            processes = _repos[key] = RepoProcesses(repo_path)
+        return processes
+
+
+def close_all():
+    with _repos_lock:
+        for processes in _repos.values():
+            processes.close()
+        _repos.clear()
+
+
+atexit.register(close_all)
+
+
+def _usable(name):
+    return bool(name) and '\n' not in name and '\r' not in name
+
+
+def _is_full_oid(name):
+    return len(name) == 40 and all(c in '0123456789abcdef' for c in name)
+
+
+def read_object(repo_path, name):
+    """
+    Return (oid, type, bytes) for an object name such as `<commit>:<path>`,
+    None if it does not exist, or False if the batch process is unavailable
+    (callers then run git directly).
+    """
+    processes = for_repo(repo_path)
+    if processes is None or not _usable(name):
+        return False
+    answer = processes.cat_file.ask(name, _read_object)
+    if answer is None:
+        return False  # The process died; let the caller run git itself
+    return answer or None
+
+
+def object_info(repo_path, name):
+    """Like read_object(), but returns (oid, type, size) without the contents."""
+    processes = for_repo(repo_path)
+    if processes is None or not _usable(name):
+        return False
+    answer = processes.cat_file_check.ask(name, _read_info)
+    if answer is None:
+        return False
+    return answer or None
+
+
+def changed_entries(repo_path, commit_hash):
+    """
+    (path, mode, oid) for every path changed by a commit (a full OID), with
+    the mode and OID the path has in that commit (mode '000000' when the
+    commit deletes it), or None if the batch process is unavailable.
+    """
+    processes = for_repo(repo_path)
+    if processes is None or not _is_full_oid(commit_hash or ''):
+        return None
+    return processes.diff_tree.ask(f"{commit_hash}\n{DIFF_TREE_SENTINEL}", _read_changes)
+
+
+def changed_paths(repo_path, commit_hash):
+    """
+    Paths changed by a commit (a full OID) as `git show --name-only` lists
+    them, or None if the batch process is unavailable.
+    """
+    changes = changed_entries(repo_path, commit_hash)
+    return None if changes is None else [path for path, _, _ in changes]
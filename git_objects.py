@@ -0,0 +1,799 @@
+import os
+import mmap
+import heapq
+import zlib
+import struct
+import binascii
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+
+# Pure-Python reader for the git object database (loose objects, packfiles and
+# their .idx files). Used as an in-process alternative to forking `git` for
+# commit parsing, tree walks and blob reads.
+
+OBJ_COMMIT = 1
+OBJ_TREE = 2
+OBJ_BLOB = 3
+OBJ_TAG = 4
+OBJ_OFS_DELTA = 6
+OBJ_REF_DELTA = 7
+
+TYPE_NAMES = {OBJ_COMMIT: 'commit', OBJ_TREE: 'tree', OBJ_BLOB: 'blob', OBJ_TAG: 'tag'}
+
+TREE_CACHE_ENTRIES = 4096
+COMMIT_CACHE_ENTRIES = 65536
+BLOB_READER_CACHE_ENTRIES = 8
+DEFAULT_DELTA_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class GitObjectError(Exception):
+    """Raised when an object cannot be found or decoded."""
+
+
+def is_hexsha(value):
+    return len(value) == 40 and all(c in '0123456789abcdef' for c in value)
+
+
+def to_binsha(hexsha):
+    """Convert a 40-character hex SHA to 20 bytes, raising GitObjectError if it is not one."""
+    if not is_hexsha(hexsha or ''):
+        raise GitObjectError(f"Not an object name: {hexsha!r}")
+    return binascii.unhexlify(hexsha)
+
+
+def apply_delta(base, delta):
+    """Apply a git delta instruction stream to the base object bytes."""
+    delta = memoryview(delta)
+    pos = 0
+
+    def read_varint(pos):
+        value = shift = 0
+        while True:
+            byte = delta[pos]
+            pos += 1
+            value |= (byte & 0x7f) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value, pos
+
+    base_size, pos = read_varint(pos)
+    result_size, pos = read_varint(pos)
+    if base_size != len(base):
+        raise GitObjectError("Delta base size mismatch")
+
+    out = bytearray()
+    end = len(delta)
+    while pos < end:
+        opcode = delta[pos]
+        pos += 1
+        if opcode & 0x80:
+            # Copy a range from the base object
+            offset = size = 0
+            for i in range(4):
+                if opcode & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if opcode & (1 << (4 + i)):
+                    size |= delta[pos] << (8 * i)
+                    pos += 1
+            if size == 0:
+                size = 0x10000
+            out += base[offset:offset + size]
+        elif opcode:
+            # Insert literal bytes from the delta itself
+            out += delta[pos:pos + opcode]
+            pos += opcode
+        else:
+            raise GitObjectError("Invalid delta opcode 0")
+
+    if len(out) != result_size:
+        raise GitObjectError("Delta result size mismatch")
+    return bytes(out)
+
+
+def inflate(buffer, offset, size_hint=None):
+    """Inflate a zlib stream starting at offset in a buffer (bytes or mmap)."""
+    decompressor = zlib.decompressobj()
+    view = memoryview(buffer)[offset:]
+    chunk = 65536
+    out = []
+    pos = 0
+    while not decompressor.eof:
+        piece = view[pos:pos + chunk]
+        if not piece:
+            raise GitObjectError("Truncated zlib stream")
+        out.append(decompressor.decompress(piece))
+        pos += chunk
+    view.release()
+    data = b''.join(out)
+    if size_hint is not None and len(data) != size_hint:
+        raise GitObjectError("Inflated size mismatch")
+    return data
+
+
+class DeltaBaseCache:
+    """
+    Byte-bounded LRU cache of resolved pack objects keyed by (pack, offset).
+    Related file versions share delta bases, so extracting many similar files
+    would otherwise inflate and re-apply the same chain over and over.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_DELTA_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()  # A warm store may be shared by worker threads
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, obj_type, data):
+        size = len(data)
+        with self._lock:
+            if size > self.max_bytes or key in self._entries:
+                return
+            self._entries[key] = (obj_type, data)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+class PackIndex:
+    """
+    A version 2 pack .idx file. The file is memory-mapped and searched in place
+    (fanout table plus binary search), so it is never read into memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:4] != b'\xfftOc' or struct.unpack('>I', self._map[4:8])[0] != 2:
+            self._map.close()
+            raise GitObjectError(f"Unsupported pack index format: {path}")
+        self._fanout = struct.unpack('>256I', self._map[8:8 + 1024])
+        self.count = self._fanout[255]
+        self._names_offset = 8 + 1024
+        self._crc_offset = self._names_offset + 20 * self.count
+        self._offsets_offset = self._crc_offset + 4 * self.count
+        self._large_offset = self._offsets_offset + 4 * self.count
+
+    def close(self):
+        self._map.close()
+
+    def _name_at(self, index):
+        start = self._names_offset + 20 * index
+        return self._map[start:start + 20]
+
+    def _offset_at(self, index):
+        start = self._offsets_offset + 4 * index
+        offset = struct.unpack('>I', self._map[start:start + 4])[0]
+        if offset & 0x80000000:
+            start = self._large_offset + 8 * (offset & 0x7fffffff)
+            offset = struct.unpack('>Q', self._map[start:start + 8])[0]
+        return offset
+
+    def find(self, binsha):
+        """Return the pack offset of an object, or None if it is not indexed."""
+        first = binsha[0]
+        lo = self._fanout[first - 1] if first else 0
+        hi = self._fanout[first]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            name = self._name_at(mid)
+            if name < binsha:
+                lo = mid + 1
+            elif name > binsha:
+                hi = mid
+            else:
+                return self._offset_at(mid)
+        return None
+
+    def find_prefix(self, prefix_hex):
+        """Return all full hex OIDs in this index starting with prefix_hex."""
+        binstart = binascii.unhexlify(prefix_hex + '0' * (40 - len(prefix_hex)))
+        first = binstart[0]
+        lo = self._fanout[first - 1] if first else 0
+        hi = self._fanout[first]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name_at(mid) < binstart:
+                lo = mid + 1
+            else:
+                hi = mid
+        matches = []
+        while lo < self.count:
+            hexsha = binascii.hexlify(self._name_at(lo)).decode('ascii')
+            if not hexsha.startswith(prefix_hex):
+                break
+            matches.append(hexsha)
+            lo += 1
+        return matches
+
+
+class PackFile:
+    """A memory-mapped .pack file with delta resolution."""
+
+    def __init__(self, pack_path, index, store):
+        self.path = pack_path
+        self.index = index
+        self.store = store
+        with open(pack_path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:4] != b'PACK':
+            self._map.close()
+            raise GitObjectError(f"Not a packfile: {pack_path}")
+
+    def close(self):
+        self._map.close()
+        self.index.close()
+
+    def _read_header(self, offset):
+        """Parse an entry header, returning (type, size, data_offset, base)."""
+        data = self._map
+        byte = data[offset]
+        offset += 1
+        obj_type = (byte >> 4) & 7
+        size = byte & 0x0f
+        shift = 4
+        while byte & 0x80:
+            byte = data[offset]
+            offset += 1
+            size |= (byte & 0x7f) << shift
+            shift += 7
+
+        base = None
+        if obj_type == OBJ_OFS_DELTA:
+            byte = data[offset]
+            offset += 1
+            rel = byte & 0x7f
+            while byte & 0x80:
+                byte = data[offset]
+                offset += 1
+                rel = ((rel + 1) << 7) | (byte & 0x7f)
+            base = rel
+        elif obj_type == OBJ_REF_DELTA:
+            base = bytes(data[offset:offset + 20])
+            offset += 20
+        return obj_type, size, offset, base
+
+    def object_size(self, offset):
+        """
+        Return the inflated size of the object at a pack offset. For deltas
+        only the first bytes are inflated to read the result-size header.
+        """
+        obj_type, size, data_offset, _ = self._read_header(offset)
+        if obj_type not in (OBJ_OFS_DELTA, OBJ_REF_DELTA):
+            return size
+        decompressor = zlib.decompressobj()
+        header = decompressor.decompress(self._map[data_offset:data_offset + 512], 32)
+        pos = 0
+        for _ in range(2):
+            value = shift = 0
+            while True:
+                byte = header[pos]
+                pos += 1
+                value |= (byte & 0x7f) << shift
+                shift += 7
+                if not byte & 0x80:
+                    break
+        return value
+
+    def read_at(self, offset):
+        """Return (type_name, data) for the object stored at a pack offset."""
+        cache = self.store.delta_cache
+        cached = cache.get((self.path, offset))
+        if cached is not None:
+            return cached
+
+        # Walk the delta chain down to its base iteratively (aggressive packs
+        # can have chains far deeper than the recursion limit), stopping early
+        # at the first object already resolved in the cache.
+        deltas = []
+        while True:
+            obj_type, size, data_offset, base = self._read_header(offset)
+            if obj_type == OBJ_OFS_DELTA:
+                deltas.append((offset, data_offset, size))
+                offset -= base
+                cached = cache.get((self.path, offset))
+                if cached is not None:
+                    base_type, data = cached
+                    break
+            elif obj_type == OBJ_REF_DELTA:
+                deltas.append((offset, data_offset, size))
+                base_type, data = self.store.read_binsha(base)
+                break
+            elif obj_type in TYPE_NAMES:
+                base_type, data = TYPE_NAMES[obj_type], inflate(self._map, data_offset, size)
+                if deltas:
+                    cache.put((self.path, offset), base_type, data)
+                break
+            else:
+                raise GitObjectError(f"Unknown object type {obj_type} in {self.path}")
+
+        for entry_offset, data_offset, size in reversed(deltas):
+            data = apply_delta(data, inflate(self._map, data_offset, size))
+            cache.put((self.path, entry_offset), base_type, data)
+        return base_type, data
+
+
+def format_git_date(timestamp, tz_offset):
+    """Format a raw git timestamp like `git log --date=iso` does."""
+    sign = -1 if tz_offset.startswith('-') else 1
+    hours, minutes = int(tz_offset[1:3]), int(tz_offset[3:5])
+    tz = timezone(sign * timedelta(hours=hours, minutes=minutes))
+    dt = datetime.fromtimestamp(int(timestamp), tz)
+    return dt.strftime('%Y-%m-%d %H:%M:%S ') + tz_offset
+
+
+def parse_signature(value):
+    """Split an author/committer line into (name, email, timestamp, tz)."""
+    name, _, rest = value.partition(' <')
+    email, _, when = rest.partition('> ')
+    timestamp, _, tz_offset = when.partition(' ')
+    return name, email, timestamp, tz_offset
+
+
+class GitObjectStore:
+    """In-process access to a repository's objects and refs."""
+
+    def __init__(self, repo_path, delta_cache_bytes=DEFAULT_DELTA_CACHE_BYTES):
+        self.repo_path = repo_path
+        self.delta_cache = DeltaBaseCache(delta_cache_bytes)
+        self.git_dir = os.path.join(repo_path, '.git')
+        if not os.path.isdir(self.git_dir):
+            raise GitObjectError(f"Not a valid git repository: '{repo_path}'")
+        self.objects_dirs = [os.path.join(self.git_dir, 'objects')]
+        alternates = os.path.join(self.git_dir, 'objects', 'info', 'alternates')
+        if os.path.exists(alternates):
+            with open(alternates, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        self.objects_dirs.append(os.path.join(self.git_dir, 'objects', line))
+        # A warm store may be shared by worker threads: the pack list is replaced,
+        # never mutated in place, and the ref and blob-reader caches are guarded
+        self._lock = threading.Lock()
+        self.packs = []
+        self._tree_cache = {}
+        self._commit_cache = {}
+        self._ref_cache = {}
+        self._blob_readers = OrderedDict()
+        self._pack_state = None
+        self._load_packs()
+
+    def _pack_dirs_state(self):
+        state = []
+        for objects_dir in self.objects_dirs:
+            pack_dir = os.path.join(objects_dir, 'pack')
+            if os.path.isdir(pack_dir):
+                state.append((pack_dir, os.stat(pack_dir).st_mtime_ns))
+        return state
+
+    def _load_packs(self):
+        """Add packs not loaded yet (called with the lock held, or from __init__)."""
+        self._pack_state = self._pack_dirs_state()
+        packs = list(self.packs)
+        loaded = {pack.path for pack in packs}
+        for objects_dir in self.objects_dirs:
+            pack_dir = os.path.join(objects_dir, 'pack')
+            if not os.path.isdir(pack_dir):
+                continue
+            for name in sorted(os.listdir(pack_dir)):
+                if not name.endswith('.idx'):
+                    continue
+                idx_path = os.path.join(pack_dir, name)
+                pack_path = idx_path[:-4] + '.pack'
+                if os.path.exists(pack_path) and pack_path not in loaded:
+                    packs.append(PackFile(pack_path, PackIndex(idx_path), self))
+        self.packs = packs
+
+    def refresh(self):
+        """
+        Pick up packs written since the store was opened (e.g. after a fetch
+        or gc). Objects are immutable, so cached trees and commits stay valid;
+        packs removed by a repack are dropped. Dropped packs are not closed,
+        as another thread may still be reading from them; their mmaps are
+        released once they are garbage collected.
+        """
+        with self._lock:
+            if self._pack_dirs_state() == self._pack_state:
+                return False
+            self.packs = [pack for pack in self.packs if os.path.exists(pack.path)]
+            self._load_packs()
+            return True
+
+    def close(self):
+        with self._lock:
+            packs, self.packs = self.packs, []
+            self._blob_readers.clear()
+        for pack in packs:
+            pack.close()
+        self.delta_cache.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Raw objects ---
+
+    def _read_loose(self, hexsha):
+        for objects_dir in self.objects_dirs:
+            path = os.path.join(objects_dir, hexsha[:2], hexsha[2:])
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    raw = zlib.decompress(f.read())
+                header, _, body = raw.partition(b'\0')
+                obj_type, _, size = header.decode('ascii').partition(' ')
+                if int(size) != len(body):
+                    raise GitObjectError(f"Corrupt loose object {hexsha}")
+                return obj_type, body
+        return None
+
+    def read_binsha(self, binsha):
+        """Read an object by its 20-byte binary SHA."""
+        for pack in self.packs:
+            offset = pack.index.find(binsha)
+            if offset is not None:
+                return pack.read_at(offset)
+        hexsha = binascii.hexlify(binsha).decode('ascii')
+        loose = self._read_loose(hexsha)
+        if loose is None:
+            raise GitObjectError(f"Object not found: {hexsha}")
+        return loose
+
+    def read(self, hexsha):
+        """Read an object by hex SHA, returning (type_name, data)."""
+        return self.read_binsha(to_binsha(hexsha))
+
+    def object_size(self, hexsha):
+        """Return an object's size without inflating its full contents."""
+        binsha = to_binsha(hexsha)
+        for pack in self.packs:
+            offset = pack.index.find(binsha)
+            if offset is not None:
+                return pack.object_size(offset)
+        for objects_dir in self.objects_dirs:
+            path = os.path.join(objects_dir, hexsha[:2], hexsha[2:])
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    header = zlib.decompressobj().decompress(f.read(1024), 64)
+                return int(header.split(b'\0', 1)[0].split(b' ', 1)[1])
+        raise GitObjectError(f"Object not found: {hexsha}")
+
+    def contains(self, hexsha):
+        binsha = to_binsha(hexsha)
+        if any(pack.index.find(binsha) is not None for pack in self.packs):
+            return True
+        return any(os.path.exists(os.path.join(d, hexsha[:2], hexsha[2:])) for d in self.objects_dirs)
+
+    # --- Refs ---
+
+    def _expand_prefix(self, prefix):
+        prefix = prefix.lower()
+        matches = set()
+        for pack in self.packs:
+            matches.update(pack.index.find_prefix(prefix))
+        for objects_dir in self.objects_dirs:
+            loose_dir = os.path.join(objects_dir, prefix[:2])
+            if os.path.isdir(loose_dir):
+                for name in os.listdir(loose_dir):
+                    if (prefix[:2] + name).startswith(prefix):
+                        matches.add(prefix[:2] + name)
+        return matches.pop() if len(matches) == 1 else None
+
+    def _read_ref(self, ref, depth=0):
+        """Return the hex SHA a ref points to, or None if it does not exist or holds no SHA."""
+        if depth > 5:
+            return None
+        # Only refs/* and the top-level *HEAD pseudo-refs are refs; other files
+        # in $GIT_DIR (config, description, ...) are not
+        if not (ref.startswith('refs/') or ('/' not in ref and ref.endswith('HEAD'))):
+            return None
+        if '..' in ref or '\\' in ref or ref.endswith('/'):
+            return None
+        path = os.path.join(self.git_dir, ref)
+        if os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                value = f.read().strip()
+            if value.startswith('ref: '):
+                return self._read_ref(value[5:].strip(), depth + 1)
+            value = value.split(None, 1)[0].lower() if value else ''  # FETCH_HEAD: "<sha>\t...\n..."
+            return value if is_hexsha(value) else None
+        packed = os.path.join(self.git_dir, 'packed-refs')
+        if os.path.exists(packed):
+            with open(packed, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.startswith('#') or line.startswith('^'):
+                        continue
+                    parts = line.strip().split(' ', 1)
+                    if len(parts) == 2 and parts[1] == ref:
+                        return parts[0] if is_hexsha(parts[0]) else None
+        return None
+
+    def resolve(self, rev):
+        """
+        Resolve a branch, tag, ref or (abbreviated) hex SHA to a commit SHA.
+        Returns None for anything more complex (e.g. `HEAD~2`), which callers
+        should hand to the git CLI instead. Refs are read from disk on every
+        call, since any loose ref file may change; only hex SHAs, which always
+        name the same object, are cached.
+        """
+        if not rev:
+            return None
+        rev = rev.strip()
+        for ref in (rev, f'refs/{rev}', f'refs/heads/{rev}', f'refs/tags/{rev}', f'refs/remotes/{rev}'):
+            hexsha = self._read_ref(ref)
+            if hexsha:
+                return self.peel_to_commit(hexsha)
+        if not (4 <= len(rev) <= 40 and all(c in '0123456789abcdefABCDEF' for c in rev)):
+            return None
+        with self._lock:
+            if rev in self._ref_cache:
+                return self._ref_cache[rev]
+        hexsha = rev.lower() if len(rev) == 40 else self._expand_prefix(rev)
+        if not (hexsha and self.contains(hexsha)):
+            return None  # Not cached: the object may still arrive
+        resolved = self.peel_to_commit(hexsha)
+        with self._lock:
+            self._ref_cache[rev] = resolved
+        return resolved
+
+    def peel_to_commit(self, hexsha):
+        """Follow annotated tags until a commit is reached."""
+        obj_type, data = self.read(hexsha)
+        while obj_type == 'tag':
+            try:
+                hexsha = data.split(b'\n', 1)[0].split(b' ', 1)[1].decode('ascii')
+            except (IndexError, ValueError):
+                raise GitObjectError(f"Corrupt tag object {hexsha}")
+            obj_type, data = self.read(hexsha)
+        return hexsha if obj_type == 'commit' else None
+
+    # --- Commits and trees ---
+
+    def read_commit(self, hexsha):
+        """Parse a commit object into a dictionary."""
+        cached = self._commit_cache.get(hexsha)
+        if cached is not None:
+            return cached
+        obj_type, data = self.read(hexsha)
+        if obj_type != 'commit':
+            raise GitObjectError(f"{hexsha} is a {obj_type}, not a commit")
+        header, _, message = data.partition(b'\n\n')
+        commit = {'hash': hexsha, 'tree': None, 'parents': []}
+        for line in header.decode('utf-8', errors='ignore').splitlines():
+            if line.startswith(' '):
+                continue  # Continuation of a multi-line header (e.g. gpgsig)
+            key, _, value = line.partition(' ')
+            if key == 'tree':
+                commit['tree'] = value
+            elif key == 'parent':
+                commit['parents'].append(value)
+            elif key in ('author', 'committer'):
+                commit[key] = parse_signature(value)
+        commit['message'] = message.decode('utf-8', errors='ignore')
+        if len(self._commit_cache) >= COMMIT_CACHE_ENTRIES:
+            self._commit_cache.clear()
+        self._commit_cache[hexsha] = commit
+        return commit
+
+    def commit_details(self, hexsha):
+        """Return commit details in the same shape as get_commit_details()."""
+        commit = self.read_commit(hexsha)
+        name, email, timestamp, tz_offset = commit['author']
+        subject = commit['message'].split('\n', 1)[0].strip()
+        return {
+            'hash': hexsha,
+            'author_name': name,
+            'author_email': email,
+            'date': format_git_date(timestamp, tz_offset),
+            'message': subject
+        }
+
+    def walk_commits(self, include, exclude=None):
+        """
+        Yield commit SHAs reachable from include but not from exclude, newest
+        committer date first (the default `git log A..B` ordering).
+        """
+        hidden = set()
+        if exclude:
+            stack = [exclude]
+            while stack:
+                hexsha = stack.pop()
+                if hexsha in hidden:
+                    continue
+                hidden.add(hexsha)
+                stack.extend(self.read_commit(hexsha)['parents'])
+
+        seen = set([include])
+        queue = []
+        counter = 0
+
+        def push(hexsha):
+            nonlocal counter
+            commit = self.read_commit(hexsha)
+            timestamp = int(commit['committer'][2]) if 'committer' in commit else 0
+            heapq.heappush(queue, (-timestamp, counter, hexsha, commit['parents']))
+            counter += 1
+
+        if include not in hidden:
+            push(include)
+        while queue:
+            _, _, hexsha, parents = heapq.heappop(queue)
+            yield hexsha
+            for parent in parents:
+                if parent not in seen and parent not in hidden:
+                    seen.add(parent)
+                    push(parent)
+
+    def read_tree(self, hexsha):
+        """Return a tree's entries as a list of (mode, name, hexsha)."""
+        cached = self._tree_cache.get(hexsha)
+        if cached is not None:
+            return cached
+        obj_type, data = self.read(hexsha)
+        if obj_type != 'tree':
+            raise GitObjectError(f"{hexsha} is a {obj_type}, not a tree")
+        entries = []
+        pos = 0
+        end = len(data)
+        while pos < end:
+            space = data.index(b' ', pos)
+            nul = data.index(b'\0', space)
+            mode = data[pos:space].decode('ascii')
+            name = data[space + 1:nul].decode('utf-8', errors='surrogateescape')
+            entries.append((mode, name, binascii.hexlify(data[nul + 1:nul + 21]).decode('ascii')))
+            pos = nul + 21
+        # Path lookups re-read the same top-level trees for every file
+        if len(self._tree_cache) >= TREE_CACHE_ENTRIES:
+            self._tree_cache.clear()
+        self._tree_cache[hexsha] = entries
+        return entries
+
+    def walk_tree(self, tree_hexsha, prefix=''):
+        """Recursively yield (path, mode, hexsha) for every non-tree entry."""
+        for mode, name, hexsha in self.read_tree(tree_hexsha):
+            path = f"{prefix}{name}"
+            if mode == '40000':
+                yield from self.walk_tree(hexsha, path + '/')
+            else:
+                yield path, mode, hexsha
+
+    def lookup_path(self, commit_hexsha, path):
+        """Return (mode, hexsha) of a path in a commit's tree, or None."""
+        tree = self.read_commit(commit_hexsha)['tree']
+        parts = [p for p in path.split('/') if p]
+        for i, part in enumerate(parts):
+            for mode, name, hexsha in self.read_tree(tree):
+                if name == part:
+                    break
+            else:
+                return None
+            if i == len(parts) - 1:
+                return mode, hexsha
+            if mode != '40000':
+                return None
+            tree = hexsha
+        return None
+
+    def blob_reader(self, commit_hexsha):
+        """Return a (cached) BlobReader for a commit, so repeat jobs reuse resolved trees."""
+        with self._lock:
+            reader = self._blob_readers.get(commit_hexsha)
+            if reader is not None:
+                self._blob_readers.move_to_end(commit_hexsha)
+                return reader
+        # Built outside the lock: reading the commit may inflate objects
+        reader = BlobReader(self, commit_hexsha)
+        with self._lock:
+            reader = self._blob_readers.setdefault(commit_hexsha, reader)
+            self._blob_readers.move_to_end(commit_hexsha)
+            while len(self._blob_readers) > BLOB_READER_CACHE_ENTRIES:
+                self._blob_readers.popitem(last=False)
+        return reader
+
+
+class BlobReader:
+    """
+    Reads many paths at a single commit. Directory trees are resolved once
+    and shared between sibling paths, and blob reads go through the store's
+    delta-base cache.
+    """
+
+    def __init__(self, store, commit_hexsha):
+        self.store = store
+        self.commit_hexsha = commit_hexsha
+        self._root_tree = store.read_commit(commit_hexsha)['tree']
+        self._dirs = {'': self._root_tree}
+        self._known = {}
+        self.blobs_read = 0
+        self.bytes_read = 0
+
+    def _tree_for_dir(self, dir_path):
+        """Return the tree SHA of a directory at this commit, or None."""
+        if dir_path in self._dirs:
+            return self._dirs[dir_path]
+        parent, _, name = dir_path.rpartition('/')
+        parent_tree = self._tree_for_dir(parent)
+        tree = None
+        if parent_tree:
+            for mode, entry_name, hexsha in self.store.read_tree(parent_tree):
+                if entry_name == name:
+                    tree = hexsha if mode == '40000' else None
+                    break
+        self._dirs[dir_path] = tree
+        return tree
+
+    def add_entries(self, changes):
+        """
+        Seed path entries from tree-diff change records so those paths are
+        read by OID directly, without any tree lookups.
+        """
+        for change in changes:
+            if change['new_oid']:
+                self._known[change['path']] = (change['new_mode'], change['new_oid'])
+            else:
+                self._known[change['path']] = None
+
+    def entry(self, path):
+        """Return (mode, hexsha) for a path, or None if it is not present."""
+        if path in self._known:
+            return self._known[path]
+        dir_path, _, name = path.strip('/').rpartition('/')
+        tree = self._tree_for_dir(dir_path)
+        if not tree:
+            return None
+        for mode, entry_name, hexsha in self.store.read_tree(tree):
+            if entry_name == name:
+                return mode, hexsha
+        return None
+
+    def read(self, path):
+        """Return blob bytes for a path, or None if it is absent or not a blob."""
+        entry = self.entry(path)
+        if entry is None or entry[0] in ('40000', '160000'):
+            return None
+        obj_type, data = self.store.read(entry[1])
+        if obj_type != 'blob':
+            return None
+        self.blobs_read += 1
+        self.bytes_read += len(data)
+        return data
+
+    def stats(self):
+        cache = self.store.delta_cache
+        return (f"{self.blobs_read} blobs ({self.bytes_read} bytes) read in-process; "
+                f"delta-base cache {cache.hits} hits / {cache.misses} misses, "
+                f"{cache.current_bytes // 1024} KiB resident")
+
+
+def open_object_store(repo_path, log_callback=print, delta_cache_bytes=DEFAULT_DELTA_CACHE_BYTES):
+    """
+    Open the in-process object store, or return None so callers fall back
+    to the git CLI (e.g. unsupported index versions or worktree layouts).
+    """
+    try:
+        return GitObjectStore(repo_path, delta_cache_bytes)
+    except (GitObjectError, OSError, ValueError) as e:
+        log_callback(f"Warning: In-process git backend unavailable ({e}). Falling back to git CLI.")
+        return None
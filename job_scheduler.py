@@ -0,0 +1,151 @@
+import os
+import heapq
+import threading
+from collections import Counter
+
+# Priority scheduler for archive/preview jobs. Jobs run on a fixed set of
+# worker threads, highest priority first, with a cap on how many jobs may run
+# against the same repository at once. Identical in-flight requests (same
+# repository, resolved commit OIDs, mode and output format) are coalesced:
+# later submissions attach to the first one and share its result.
+
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+
+def parse_priority(value):
+    """Accept a priority name or integer (lower runs first)."""
+    if value is None:
+        return PRIORITIES['normal']
+    if isinstance(value, str) and value in PRIORITIES:
+        return PRIORITIES[value]
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid priority '{value}' (use {', '.join(PRIORITIES)} or an integer)")
+
+
+def request_key(kind, params, resolve):
+    """
+    Build the coalescing key for a job. `resolve(rev)` must return a full
+    commit OID or None; refs are resolved so that e.g. `main` and the SHA it
+    points to are recognised as the same request. Returns None when the
+    request cannot be keyed, in which case it is never coalesced.
+    """
+    mode = params.get('mode')
+    if mode == 'date':
+        head = resolve(params.get('branch'))
+        revs = (head, params.get('start_date'), params.get('end_date'), bool(params.get('date_tree_diff')))
+    elif mode == 'sha_range':
+        revs = (resolve(params.get('start_sha')), resolve(params.get('end_sha')))
+    elif mode == 'commit_sha':
+        revs = (resolve(params.get('commit_sha')),)
+    else:
+        return None
+    if not all(revs):
+        return None
+    output = ()
+    if kind == 'archive':
+        output = (params.get('archive_format', 'zip'), tuple(sorted(params.get('changelog_formats') or [])),
+                  params.get('patches'), bool(params.get('per_commit')), params.get('max_volume_mb'),
+                  params.get('large_file_mb'), params.get('large_file_policy'), params.get('lfs'),
+                  bool(params.get('reproducible', True)))
+    return (kind, os.path.realpath(params['repo_path']), mode, revs, output)
+
+
+class JobScheduler:
+    """
+    Runs jobs via `run_job(job)`. Jobs must provide `repo`, `priority`, `key`,
+    `status`, `finished` and `add_follower(job)`, which returns False when the
+    job can no longer take followers.
+    """
+
+    def __init__(self, run_job, workers=4, per_repo_limit=2):
+        self.run_job = run_job
+        self.per_repo_limit = per_repo_limit
+        self._heap = []
+        self._seq = 0
+        self._running = Counter()
+        self._in_flight = {}
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._threads = [threading.Thread(target=self._worker, name=f'archive-worker-{i}', daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _push(self, job):
+        self._seq += 1
+        heapq.heappush(self._heap, (job.priority, self._seq, job))
+
+    def submit(self, job):
+        """
+        Queue a job, or attach it to an identical in-flight job. Returns the
+        job that will actually do the work.
+        """
+        with self._cond:
+            leader = self._in_flight.get(job.key) if job.key else None
+            if leader is not None and not leader.finished and leader.add_follower(job):
+                if job.priority < leader.priority and leader.status == 'queued':
+                    # Inherit the more urgent priority; the old heap entry goes stale
+                    leader.priority = job.priority
+                    self._push(leader)
+                    self._cond.notify()
+                return leader
+            if job.key:
+                self._in_flight[job.key] = job
+            self._push(job)
+            self._cond.notify()
+            return job
+
+    def _next_job(self):
+        """Pop the most urgent runnable job (called with the lock held)."""
+        deferred = []
+        chosen = None
+        while self._heap:
+            priority, seq, job = heapq.heappop(self._heap)
+            if job.status != 'queued' or priority != job.priority:
+                continue  # Stale entry (re-prioritised, cancelled or already taken)
+            if self._running[job.repo] >= self.per_repo_limit:
+                deferred.append((priority, seq, job))
+                continue
+            chosen = job
+            break
+        for entry in deferred:
+            heapq.heappush(self._heap, entry)
+        return chosen
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None and not self._stopping:
+                    self._cond.wait()
+                    job = self._next_job()
+                if self._stopping:
+                    return
+                job.status = 'starting'
+                self._running[job.repo] += 1
+            try:
+                self.run_job(job)
+            finally:
+                with self._cond:
+                    self._running[job.repo] -= 1
+                    if job.key and self._in_flight.get(job.key) is job:
+                        del self._in_flight[job.key]
+                    self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'queued': len({id(job) for _, _, job in self._heap if job.status == 'queued'}),
+                'running': dict((repo, n) for repo, n in self._running.items() if n),
+                'in_flight_keys': len(self._in_flight)
+            }
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
@@ -0,0 +1,100 @@
+import os
+
+# Large-file handling for single-archive exports. Blob sizes for the whole
+# export are fetched up front in one batch, and every decision is made before
+# any content is read:
+#
+#   skip    files above the threshold are left out of the archive
+#   store   they are archived without compression (zip; tar formats have no
+#           per-entry compression)
+#   list    they are left out of the archive but listed with OID and size
+#
+# Git LFS pointer files (small blobs in the pointer format) can be resolved to
+# their content from the repository's local LFS object store. The policy then
+# applies to the size of the real object, not the pointer. Every decision is
+# returned as a record for the changelog.
+
+LARGE_FILE_POLICIES = ['skip', 'store', 'list']
+LFS_MODES = ['keep', 'resolve']
+LFS_POINTER_MAX_BYTES = 1024  # Pointers are ~130 bytes; the LFS spec caps them at 1024
+LFS_POINTER_VERSION = b'version https://git-lfs.github.com/spec/v1\n'
+LFS_LEGACY_VERSIONS = (b'version https://hawser.github.com/spec/v1\n',)
+
+
+def parse_lfs_pointer(data):
+    """Return (sha256 oid, size) for a Git LFS pointer blob, or None if data is not one."""
+    if len(data) > LFS_POINTER_MAX_BYTES:
+        return None
+    if not (data.startswith(LFS_POINTER_VERSION) or data.startswith(LFS_LEGACY_VERSIONS)):
+        return None
+    fields = {}
+    for line in data.decode('utf-8', errors='replace').splitlines()[1:]:
+        key, _, value = line.partition(' ')
+        fields[key] = value.strip()
+    oid = fields.get('oid', '')
+    size = fields.get('size', '')
+    if not oid.startswith('sha256:') or len(oid) != 71 or not size.isdigit():
+        return None
+    return oid[7:], int(size)
+
+
+def lfs_object_path(git_dir, oid):
+    """Path of an LFS object in the local store (`.git/lfs/objects/ab/cd/abcd...`)."""
+    return os.path.join(git_dir, 'lfs', 'objects', oid[:2], oid[2:4], oid)
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024.0
+
+
+def plan_large_files(blobs, sizes, pointers, git_dir, threshold_bytes=None, policy='store'):
+    """
+    Decide how each blob is archived. `blobs` maps path -> blob OID, `sizes`
+    maps OID -> size and `pointers` maps the OIDs of LFS pointer blobs to
+    (sha256 oid, size). Returns path -> decision only for paths that are
+    large or LFS pointers; every other path is archived as usual. A decision
+    is a dict with 'path', 'size', 'action' ('archive', 'skip', 'store' or
+    'list'), 'lfs_oid', 'lfs_object' (local object path to archive instead
+    of the pointer) and a human-readable 'note'.
+    """
+    decisions = {}
+    for path, oid in blobs.items():
+        size = sizes.get(oid)
+        if size is None:
+            continue
+        decision = {'path': path, 'oid': oid, 'size': size, 'action': 'archive', 'lfs_oid': None,
+                    'lfs_object': None, 'note': None}
+        pointer = pointers.get(oid)
+        if pointer:
+            lfs_oid, lfs_size = pointer
+            decision['lfs_oid'] = lfs_oid
+            local = lfs_object_path(git_dir, lfs_oid)
+            if os.path.isfile(local) and os.path.getsize(local) == lfs_size:
+                decision['lfs_object'] = local
+                decision['size'] = size = lfs_size
+                decision['note'] = f"LFS object resolved from the local store ({format_size(size)})"
+            else:
+                decision['note'] = "LFS object not in the local store; pointer file archived"
+        if threshold_bytes and size > threshold_bytes:
+            decision['action'] = policy
+            decision['note'] = {
+                'skip': f"skipped, {format_size(size)} is over the {format_size(threshold_bytes)} limit",
+                'store': f"stored without compression, {format_size(size)}",
+                'list': f"listed only, {format_size(size)} is over the {format_size(threshold_bytes)} limit",
+            }[policy]
+            if policy == 'list':
+                decision['note'] += f" ({'LFS sha256:' + decision['lfs_oid'] if decision['lfs_object'] else 'blob ' + oid})"
+            elif decision['lfs_object']:
+                decision['note'] += " (LFS)"
+        if decision['note']:
+            decisions[path] = decision
+    return decisions
+
+
+def changelog_records(decisions):
+    """The decisions as sorted records for changelog_info()."""
+    return [dict((key, decision[key]) for key in ('path', 'size', 'action', 'oid', 'lfs_oid', 'note'))
+            for _, decision in sorted(decisions.items())]
@@ -0,0 +1,173 @@
+import os
+import json
+import hashlib
+import tarfile
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from archive_writer import VOLUME_INDEX_SUFFIX, load_volume_index
+
+# Machine-readable archive manifest (path, blob OID, size, mode, SHA-256 per
+# entry) and the parallel verifier behind `git_archive_by_date.py verify`.
+
+MANIFEST_SUFFIX = '.manifest.json'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def manifest_path_for(archive_path):
+    """Default manifest location for an archive path."""
+    for ext in [VOLUME_INDEX_SUFFIX, '.zip', '.tar.gz', '.tar', '.gz']:
+        if archive_path.lower().endswith(ext):
+            return archive_path[:-len(ext)] + MANIFEST_SUFFIX
+    return archive_path + MANIFEST_SUFFIX
+
+
+class ManifestWriter:
+    """
+    Writes the manifest incrementally: the header first, then one entry per
+    archived file as soon as its digest is known.
+    """
+
+    def __init__(self, path, header):
+        self.path = path
+        self.count = 0
+        self._tmp_path = f"{path}.partial"
+        self.f = open(self._tmp_path, 'w', encoding='utf-8', newline='\n')
+        self.f.write(json.dumps(header, ensure_ascii=False)[:-1] + ', "entries": [')
+
+    def add(self, path, digest, mode=None, oid=None):
+        """Record an entry; `digest` is the archive_writer.EntryDigest of its bytes."""
+        entry = {
+            'path': path,
+            'oid': oid or digest.git_oid.hexdigest(),
+            'size': digest.size,
+            'mode': mode,
+            'sha256': digest.sha256.hexdigest()
+        }
+        self.f.write(('\n  ' if self.count == 0 else ',\n  ') + json.dumps(entry, ensure_ascii=False))
+        self.count += 1
+
+    def close(self):
+        self.f.write(f'\n], "total_entries": {self.count}}}\n')
+        self.f.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self.f.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def load_manifest(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _hash_stream(stream):
+    sha256 = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = stream.read(HASH_CHUNK_SIZE)
+        if not chunk:
+            break
+        sha256.update(chunk)
+        size += len(chunk)
+    return sha256.hexdigest(), size
+
+
+def _hash_bytes(data):
+    return hashlib.sha256(data).hexdigest(), len(data)
+
+
+def _hash_zip(archive_path, pool, actual):
+    local = threading.local()
+    handles = []
+
+    def hash_member(name):
+        if not hasattr(local, 'zf'):
+            local.zf = zipfile.ZipFile(archive_path)
+            handles.append(local.zf)
+        with local.zf.open(name) as stream:
+            return name, _hash_stream(stream)
+
+    with zipfile.ZipFile(archive_path) as zf:
+        names = [info.filename for info in zf.infolist() if not info.is_dir()]
+    try:
+        for name, digest in pool.map(hash_member, names):
+            actual[name] = digest
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+def _hash_tar(archive_path, pool, jobs, actual):
+    in_flight = []
+    with tarfile.open(archive_path, 'r:*') as tf:
+        for member in tf:
+            if member.isdir():
+                continue
+            if member.issym():
+                data = member.linkname.encode('utf-8')
+            else:
+                stream = tf.extractfile(member)
+                data = stream.read() if stream else b''
+            in_flight.append((member.name, pool.submit(_hash_bytes, data)))
+            # Bound the member data held in memory while workers catch up
+            while len(in_flight) > jobs * 2:
+                name, future = in_flight.pop(0)
+                actual[name] = future.result()
+    for name, future in in_flight:
+        actual[name] = future.result()
+
+
+def verify_archive(archive_path, manifest_path=None, jobs=None, log_callback=print):
+    """
+    Check every entry of an archive against its manifest. Zip members are
+    hashed in parallel, each worker with its own handle; tar members must be
+    read sequentially, so only their hashing is spread across the pool.
+    `archive_path` may also be a `.volumes.json` index of a split archive, in
+    which case all of its volumes together are checked against the manifest.
+    Returns a result dictionary; result['ok'] is True when everything matches.
+    """
+    manifest_path = manifest_path or manifest_path_for(archive_path)
+    manifest = load_manifest(manifest_path)
+    expected = {entry['path']: entry for entry in manifest['entries']}
+    jobs = jobs or min(32, (os.cpu_count() or 1) + 4)
+    actual = {}
+
+    if archive_path.endswith(VOLUME_INDEX_SUFFIX):
+        archives = load_volume_index(archive_path)
+    else:
+        archives = [archive_path]
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for path in archives:
+            if zipfile.is_zipfile(path):
+                _hash_zip(path, pool, actual)
+            else:
+                _hash_tar(path, pool, jobs, actual)
+
+    mismatched = []
+    for path, entry in expected.items():
+        if path in actual and actual[path] != (entry['sha256'], entry['size']):
+            mismatched.append(path)
+    missing = sorted(set(expected) - set(actual))
+    unexpected = sorted(set(actual) - set(expected))
+
+    for path in sorted(mismatched):
+        log_callback(f"MISMATCH: {path}")
+    for path in missing:
+        log_callback(f"MISSING: {path}")
+    for path in unexpected:
+        log_callback(f"UNEXPECTED: {path}")
+
+    ok = not (mismatched or missing or unexpected)
+    log_callback(f"Verified {len(actual)} entries against {os.path.basename(manifest_path)}: "
+                 f"{'OK' if ok else 'FAILED'}")
+    return {
+        'ok': ok,
+        'checked': len(actual),
+        'mismatched': sorted(mismatched),
+        'missing': missing,
+        'unexpected': unexpected
+    }
@@ -0,0 +1,162 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from git_archive_by_date import commit_range_args, count_commits_in_range, run_command
+
+# Picks how the changed-file set of a range is resolved, from estimates that
+# cost at most a few small git calls:
+#
+#   commits          `git rev-list --count` over the range (no diffs)
+#   tree entries     the entry count in the .git/index header (one 12-byte read)
+#   files/commit     `git log --name-only` over the newest SAMPLE_COMMITS only
+#
+# Strategies:
+#
+#   log-walk    `git log --name-only`: one diff per commit, so its cost grows
+#               with commits x files per commit
+#   tree-diff   compare the trees at both ends of the range: its cost is bounded
+#               by the tree size however many commits the range holds. Always
+#               used for an explicit SHA range, whose file set is defined that
+#               way. For a date window it lists only net changes (a file changed
+#               and then reverted inside the window is left out), unlike the log
+#               walk, so it is only considered when the caller opts in, and then
+#               only when the window is exactly the commits between two
+#               boundary commits
+#   show        a single commit: one diff against its parent
+#
+# The planner also decides whether `git archive` streams the whole tree or
+# pathspec chunks. plan_lines() renders a plan with its estimates next to the
+# actual numbers for `--explain`.
+
+SAMPLE_COMMITS = 20
+# Stream the whole tree from `git archive` when at least this share of its blobs is wanted
+WHOLE_TREE_FRACTION = 0.9
+
+
+def index_entry_count(repo_path):
+    """Entries in .git/index, read from its header: a constant-time estimate of the tree size."""
+    try:
+        with open(os.path.join(repo_path, '.git', 'index'), 'rb') as f:
+            header = f.read(12)
+    except OSError:
+        return None
+    if len(header) < 12 or header[:4] != b'DIRC':
+        return None
+    return int.from_bytes(header[8:12], 'big')
+
+
+def sample_files_per_commit(repo_path, mode, range_kwargs):
+    """Average changed files over the newest SAMPLE_COMMITS commits of the range, or None."""
+    range_args = commit_range_args(mode, **range_kwargs)
+    if range_args is None:
+        return None
+    output = run_command(['git', 'log'] + range_args + ['-n', str(SAMPLE_COMMITS), '--name-only', '--format=%x01'],
+                         repo_path)
+    if not output:
+        return None
+    # Each commit is a \x01 marker line followed by its paths
+    counts = [len([line for line in block.splitlines() if line.strip()]) for block in output.split('\x01')[1:]]
+    if not counts:
+        return None
+    return sum(counts) / len(counts)
+
+
+def plan_range(repo_path, mode, range_kwargs, latest_commit_hash, store=None, date_tree_diff=False):
+    """
+    Estimate the range and choose a strategy; `date_tree_diff` allows a
+    tree-diff for a date window. Returns a plan dictionary with
+    'strategy', 'base' (the commit whose tree a tree-diff starts from; None
+    means the empty tree), 'reasons', 'estimate' and an empty 'actual' that
+    archive_git_history() fills in as it goes.
+    """
+    started = time.perf_counter()
+    plan = {'mode': mode, 'strategy': None, 'base': None, 'end': latest_commit_hash, 'reasons': [],
+            'estimate': {}, 'actual': {}, 'extraction': None}
+    estimate = plan['estimate']
+    estimate['commits'] = count_commits_in_range(repo_path, mode, store=store, **range_kwargs)
+    estimate['tree_entries'] = index_entry_count(repo_path)
+    estimate['files_per_commit'] = None
+    if mode == 'commit_sha':
+        plan['strategy'] = 'show'
+        plan['reasons'].append("single commit: one diff against its parent")
+    else:
+        estimate['files_per_commit'] = sample_files_per_commit(repo_path, mode, range_kwargs)
+    per_commit = estimate['files_per_commit'] or 1.0
+    log_cost = estimate['commits'] * per_commit
+    files = log_cost if mode != 'commit_sha' else None
+    if files is not None and estimate['tree_entries']:
+        files = min(files, estimate['tree_entries'])
+    estimate['files'] = int(round(files)) if files is not None else None
+
+    if mode == 'sha_range':
+        plan['strategy'] = 'tree-diff'
+        plan['base'] = range_kwargs['start_sha']
+        plan['reasons'].append("explicit range: the trees of its two ends are compared")
+    elif mode == 'date' and not date_tree_diff:
+        plan['strategy'] = 'log-walk'
+        plan['reasons'].append("date window: every commit's files are listed, including files changed and "
+                               "reverted inside the window (a tree-diff would leave those out)")
+    elif mode == 'date':
+        # Newest commit before the window (which starts at 00:00:00 inclusive); the window
+        # must be exactly base..end for a tree-diff
+        day_before = (datetime.strptime(range_kwargs['start_date'], '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+        base = run_command(['git', 'rev-list', '-1', f'--before="{day_before} 23:59:59"', latest_commit_hash],
+                           repo_path) or None
+        between = run_command(['git', 'rev-list', '--count', f"{base}..{latest_commit_hash}" if base else latest_commit_hash],
+                              repo_path)
+        contiguous = bool(between) and between.isdigit() and int(between) == estimate['commits']
+        diff_cost = estimate['tree_entries']
+        if not estimate['commits']:
+            plan['strategy'] = 'log-walk'
+            plan['reasons'].append("no commits in the window")
+        elif not contiguous:
+            plan['strategy'] = 'log-walk'
+            plan['reasons'].append(f"the window is not one contiguous range ({between or '?'} commits between its "
+                                   f"boundaries, {estimate['commits']} in the window), so only a log walk is exact")
+        elif diff_cost is None:
+            plan['strategy'] = 'log-walk'
+            plan['reasons'].append("tree size unknown (no .git/index); keeping the log walk")
+        elif log_cost > diff_cost:
+            plan['strategy'] = 'tree-diff'
+            plan['base'] = base
+            plan['reasons'].append(f"log walk ~{int(log_cost)} path diffs > tree-diff bounded by {diff_cost} tree entries")
+        else:
+            plan['strategy'] = 'log-walk'
+            plan['reasons'].append(f"log walk ~{int(log_cost)} path diffs <= tree-diff bounded by {diff_cost} tree entries")
+    plan['planning_seconds'] = time.perf_counter() - started
+    return plan
+
+
+def use_whole_tree(plan, wanted_blobs, tree_entries):
+    """Decide, and record in the plan, whether `git archive` should stream the whole tree."""
+    tree_blobs = sum(1 for entry in tree_entries.values() if entry[1] == 'blob')
+    plan['actual']['tree_entries'] = len(tree_entries)
+    whole = bool(tree_blobs) and wanted_blobs >= tree_blobs * WHOLE_TREE_FRACTION
+    plan['extraction'] = (f"git archive, whole tree ({wanted_blobs}/{tree_blobs} blobs wanted)" if whole
+                          else f"git archive, pathspec chunks ({wanted_blobs}/{tree_blobs} blobs wanted)")
+    return whole
+
+
+def plan_lines(plan):
+    """Human-readable `--explain` report of a plan, its estimates and the actual numbers."""
+    estimate, actual = plan['estimate'], plan['actual']
+
+    def number(value, fmt='{}'):
+        return '?' if value is None else fmt.format(value)
+
+    lines = [f"Range plan ({plan['mode']}): {plan['strategy']}"]
+    for reason in plan['reasons']:
+        lines.append(f"  Why:        {reason}")
+    if plan['strategy'] == 'tree-diff':
+        lines.append(f"  Trees:      {(plan['base'] or 'empty tree')[:10]} -> {(plan['end'] or '?')[:10]}")
+    lines.append(f"  Commits:    estimated {number(estimate['commits'])}, actual {number(actual.get('commits'))}")
+    lines.append(f"  Tree size:  estimated {number(estimate['tree_entries'])} entries (index), "
+                 f"actual {number(actual.get('tree_entries'))}")
+    lines.append(f"  Files:      estimated {number(estimate['files'])} "
+                 f"({number(estimate['files_per_commit'], '{:.1f}')} per commit), actual {number(actual.get('files'))}")
+    lines.append(f"  Timing:     planning {plan['planning_seconds']:.3f} s, "
+                 f"file set resolved in {number(actual.get('resolve_seconds'), '{:.3f}')} s")
+    if plan['extraction']:
+        lines.append(f"  Extraction: {plan['extraction']}")
+    return lines
@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import archive_server
+from test_git_objects import commit, git, write
+
+# Coalescing and cancellation in the archive service. The export itself is
+# replaced by a stub that runs until the test releases it or the job's
+# cancel_event is set, so each test controls when the shared work ends.
+
+WAIT_SECONDS = 10
+
+
+def wait_for(condition):
+    deadline = time.time() + WAIT_SECONDS
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("Timed out waiting for the service")
+        time.sleep(0.01)
+
+
+class ArchiveServiceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.repo = os.path.join(cls.tmp, 'repo')
+        os.makedirs(cls.repo)
+        git(cls.repo, 'init', '-q', '-b', 'main')
+        cls.commits = []
+        for day in range(1, 4):
+            write(cls.repo, 'file.txt', b'%d\n' % day)
+            cls.commits.append(commit(cls.repo, f'change {day}', day))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.started = []
+        patcher = mock.patch.object(archive_server, 'archive_git_history', self.export)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = None
+
+    def tearDown(self):
+        self.release.set()
+        if self.service:
+            self.service.shutdown()
+
+    def export(self, params):
+        self.started.append(params['commit_sha'])
+        while not self.release.wait(0.01):
+            if params['cancel_event'].is_set():
+                return None
+        return {'archive': params['output_zip']}
+
+    def start_service(self, workers=2):
+        self.service = archive_server.ArchiveService(workers=workers, default_params={'backend': 'cli'})
+        return self.service
+
+    def params(self, commit_sha):
+        return {'repo_path': self.repo, 'output_zip': os.path.join(self.tmp, 'out'), 'mode': 'commit_sha',
+                'commit_sha': commit_sha, 'backend': 'cli'}
+
+    def test_cancelled_leader_keeps_running_for_followers(self):
+        service = self.start_service()
+        leader = service.submit('archive', self.params('main'))
+        follower = service.submit('archive', self.params(self.commits[-1]))
+        self.assertEqual(follower.coalesced_with, leader.id)
+        wait_for(lambda: leader.status == 'running')
+
+        service.cancel(leader.id)
+        self.assertEqual(leader.to_dict()['status'], 'cancelled')
+        self.assertFalse(leader.cancel_event.is_set())
+        self.release.set()
+        wait_for(lambda: follower.finished)
+        self.assertEqual(follower.to_dict()['status'], 'done')
+        self.assertEqual(follower.result, {'archive': os.path.join(self.tmp, 'out')})
+        self.assertEqual(self.started, ['main'])
+
+    def test_work_stops_once_leader_and_followers_cancel(self):
+        service = self.start_service()
+        leader = service.submit('archive', self.params('main'))
+        follower = service.submit('archive', self.params('main'))
+        wait_for(lambda: leader.status == 'running')
+
+        service.cancel(follower.id)
+        self.assertFalse(leader.cancel_event.is_set())
+        service.cancel(leader.id)
+        self.assertTrue(leader.cancel_event.is_set())
+        wait_for(lambda: leader.finished)
+        self.assertEqual((leader.status, follower.status), ('cancelled', 'cancelled'))
+
+    def test_follower_refused_once_leader_is_cancelling(self):
+        service = self.start_service()
+        leader = service.submit('archive', self.params('main'))
+        wait_for(lambda: leader.status == 'running')
+        service.cancel(leader.id)
+        self.assertTrue(leader.cancel_event.is_set())
+
+        # The identical request starts fresh work instead of joining work that is stopping
+        job = service.submit('archive', self.params('main'))
+        self.assertIsNone(job.coalesced_with)
+        self.assertFalse(leader.add_follower(archive_server.Job('archive', self.params('main'))))
+        wait_for(lambda: leader.finished)
+        self.release.set()
+        wait_for(lambda: job.finished)
+        self.assertEqual((leader.status, job.status), ('cancelled', 'done'))
+        self.assertEqual(self.started, ['main', 'main'])
+
+    def test_follower_raises_the_priority_of_a_queued_leader(self):
+        service = self.start_service(workers=1)
+        first, second, third = self.commits
+        blocker = service.submit('archive', self.params(first))
+        wait_for(lambda: blocker.status == 'running')
+        leader = service.submit('archive', self.params(second), priority='low')
+        normal = service.submit('archive', self.params(third), priority='normal')
+        follower = service.submit('archive', self.params(second), priority='high')
+        self.assertEqual(follower.coalesced_with, leader.id)
+        self.assertEqual(leader.priority, archive_server.parse_priority('high'))
+
+        self.release.set()
+        wait_for(lambda: normal.finished and follower.finished)
+        self.assertEqual(self.started, [first, second, third])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import re
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import archive_watch
+from test_git_objects import commit, git, write
+
+# Watch mode against a real repository: a batch interrupted after its
+# archives, index and changelog were written but before its checkpoint must
+# be redone on restart without leaving duplicate records or entries behind.
+
+
+class Interrupted(Exception):
+    pass
+
+
+class WatchResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.repo = os.path.join(self.tmp, 'repo')
+        os.makedirs(self.repo)
+        git(self.repo, 'init', '-q', '-b', 'main')
+        self.commits = []
+        for day in range(1, 3):
+            write(self.repo, f'file{day}.txt', b'%d\n' % day)
+            self.commits.append(commit(self.repo, f'change {day}', day))
+        self.base = os.path.join(self.tmp, 'out', 'series')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def watch(self):
+        return archive_watch.watch_branch({'repo_path': self.repo, 'output_zip': self.base, 'branch': 'main',
+                                           'start_sha': self.commits[0], 'once': True,
+                                           'log_callback': lambda message: None})
+
+    def test_interrupted_batch_is_redone_on_resume(self):
+        self.watch()
+        for day in range(3, 5):
+            write(self.repo, f'file{day}.txt', b'%d\n' % day)
+            self.commits.append(commit(self.repo, f'change {day}', day))
+
+        state_path = self.base + archive_watch.WATCH_STATE_SUFFIX
+        save_json = archive_watch.save_json
+
+        def save_all_but_checkpoint(path, data):
+            if path == state_path:
+                raise Interrupted()
+            save_json(path, data)
+
+        with mock.patch.object(archive_watch, 'save_json', save_all_but_checkpoint):
+            with self.assertRaises(Interrupted):
+                self.watch()
+        # The interrupted batch did write its archives, index records and changelog entries
+        with open(self.base + archive_watch.WATCH_CHANGELOG_SUFFIX, encoding='utf-8') as f:
+            self.assertEqual(len(re.findall(r'^\[\d+\] Commit: ', f.read(), re.M)), 3)
+
+        result = self.watch()
+        self.assertEqual(result['last_commit'], self.commits[-1])
+        with open(state_path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['next_number'], 4)
+        with open(self.base + archive_watch.SERIES_INDEX_SUFFIX, encoding='utf-8') as f:
+            records = json.load(f)['commits']
+        self.assertEqual([(r['number'], r['commit']) for r in records], list(enumerate(self.commits[1:], 1)))
+        with open(self.base + archive_watch.WATCH_CHANGELOG_SUFFIX, encoding='utf-8') as f:
+            entries = re.findall(r'^\[(\d+)\] Commit: (\w+)', f.read(), re.M)
+        self.assertEqual(entries, [(str(number), oid[:10]) for number, oid in enumerate(self.commits[1:], 1)])
+        archives = sorted(name for name in os.listdir(os.path.dirname(self.base)) if name.endswith('.zip'))
+        self.assertEqual(archives, [f'series.{number:04d}-{oid[:10]}.zip'
+                                    for number, oid in enumerate(self.commits[1:], 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,328 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import git_batch
+from git_objects import OBJ_OFS_DELTA, OBJ_REF_DELTA, GitObjectError, GitObjectStore
+from tree_diff import diff_commits
+
+# Checks the pure-Python object store against git itself on generated
+# repositories: every object read, both delta encodings, ref resolution,
+# commit walks and tree diffs must match what `git cat-file`, `git rev-parse`,
+# `git rev-list` and `git diff-tree` report.
+
+EMPTY_TREE_SHA = '4b825dc642cb6eb9a060e54bf8d69288fbee4904'
+GIT_ENV = dict(os.environ, GIT_CONFIG_NOSYSTEM='1', GIT_CONFIG_GLOBAL=os.devnull, HOME=tempfile.gettempdir(),
+               GIT_AUTHOR_NAME='Test', GIT_AUTHOR_EMAIL='test@example.com',
+               GIT_COMMITTER_NAME='Test', GIT_COMMITTER_EMAIL='test@example.com')
+
+
+def git(repo, *args):
+    result = subprocess.run(['git'] + list(args), cwd=repo, env=GIT_ENV,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    return result.stdout
+
+
+def git_text(repo, *args):
+    return git(repo, *args).decode('utf-8').strip()
+
+
+def write(repo, path, content, mode=None):
+    full = os.path.join(repo, path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, 'wb') as f:
+        f.write(content)
+    if mode is not None:
+        os.chmod(full, mode)
+
+
+def commit(repo, message, day):
+    date = f"2024-01-{day:02d}T12:00:00+0000"
+    git(repo, 'add', '-A')
+    subprocess.run(['git', 'commit', '-q', '--allow-empty', '-m', message], cwd=repo, check=True,
+                   env=dict(GIT_ENV, GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date))
+    return git_text(repo, 'rev-parse', 'HEAD')
+
+
+def make_repository(path, ofs_delta=True):
+    """
+    A history with renames, deletions, mode changes, a symlink, a gitlink,
+    a non-ASCII path and a merge, packed so that most blobs are deltas, plus
+    loose objects committed after the repack.
+    """
+    os.makedirs(path)
+    git(path, 'init', '-q', '-b', 'main')
+    body = b''.join(b'line %d of a file that is long enough to be deltified\n' % i for i in range(400))
+    write(path, 'big.txt', body)
+    write(path, 'src/app/main.py', b'print("hello")\n')
+    write(path, 'docs/readme.md', b'# readme\n')
+    commit(path, 'initial', 1)
+    for day in range(2, 10):
+        write(path, 'big.txt', body + b'change %d\n' % day)
+        write(path, 'src/app/main.py', b'print("hello %d")\n' % day)
+        commit(path, f'edit {day}', day)
+    git(path, 'mv', 'docs/readme.md', 'docs/README.md')
+    write(path, 'run.sh', b'#!/bin/sh\necho run\n', 0o755)
+    os.symlink('big.txt', os.path.join(path, 'link'))
+    write(path, 'café/menü.txt', b'non-ascii\n')
+    commit(path, 'rename, executable, symlink', 10)
+    git(path, 'update-index', '--add', '--cacheinfo', f"160000,{'a' * 40},vendor/lib")
+    os.remove(os.path.join(path, 'src/app/main.py'))
+    commit(path, 'gitlink and deletion', 11)
+    git(path, 'checkout', '-q', '-b', 'description', 'HEAD~3')
+    write(path, 'side.txt', b'side branch\n')
+    commit(path, 'side', 12)
+    git(path, 'checkout', '-q', 'main')
+    subprocess.run(['git', 'merge', '-q', '--no-edit', 'description'], cwd=path, check=True,
+                   env=dict(GIT_ENV, GIT_AUTHOR_DATE='2024-01-13T12:00:00+0000',
+                            GIT_COMMITTER_DATE='2024-01-13T12:00:00+0000'), stdout=subprocess.DEVNULL)
+    git(path, 'tag', '-a', '-m', 'release', 'v1', 'HEAD~1')
+    git(path, 'tag', 'light', 'HEAD~4')
+    git(path, '-c', f'repack.useDeltaBaseOffset={str(ofs_delta).lower()}', 'repack', '-a', '-d', '-f', '-q',
+        '--window=50', '--depth=50')
+    write(path, 'big.txt', body + b'after the repack\n')
+    commit(path, 'loose', 14)
+    return path
+
+
+class GitObjectStoreTest(unittest.TestCase):
+    ofs_delta = True
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.repo = make_repository(os.path.join(cls.tmp, 'repo'), cls.ofs_delta)
+        cls.store = GitObjectStore(cls.repo)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.store.close()
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def all_objects(self):
+        output = git_text(self.repo, 'cat-file', '--batch-all-objects', '--batch-check')
+        return [line.split() for line in output.splitlines()]
+
+    def delta_types(self):
+        """Entry types of every packed object whose pack entry is a delta."""
+        types = set()
+        for pack in self.store.packs:
+            for index in range(pack.index.count):
+                obj_type = pack._read_header(pack.index._offset_at(index))[0]
+                if obj_type in (OBJ_OFS_DELTA, OBJ_REF_DELTA):
+                    types.add(obj_type)
+        return types
+
+    def test_pack_holds_expected_deltas(self):
+        self.assertEqual(self.delta_types(), {OBJ_OFS_DELTA if self.ofs_delta else OBJ_REF_DELTA})
+
+    def test_every_object_matches_cat_file(self):
+        objects = self.all_objects()
+        self.assertGreater(len(objects), 30)
+        for oid, obj_type, size in objects:
+            with self.subTest(oid=oid):
+                self.assertEqual(self.store.read(oid), (obj_type, git(self.repo, 'cat-file', obj_type, oid)))
+                self.assertEqual(self.store.object_size(oid), int(size))
+                self.assertTrue(self.store.contains(oid))
+
+    def test_reads_with_a_cold_delta_cache(self):
+        # Resolve every chain from scratch, newest objects first
+        store = GitObjectStore(self.repo, delta_cache_bytes=0)
+        try:
+            for oid, obj_type, _ in reversed(self.all_objects()):
+                self.assertEqual(store.read(oid)[1], git(self.repo, 'cat-file', obj_type, oid))
+        finally:
+            store.close()
+
+    def test_missing_and_malformed_names(self):
+        with self.assertRaises(GitObjectError):
+            self.store.read('0' * 40)
+        for name in ('not-a-sha', 'A' * 40, '0' * 39):
+            with self.assertRaises(GitObjectError):
+                self.store.read(name)
+
+    def test_resolve_matches_rev_parse(self):
+        revs = ['HEAD', 'main', 'description', 'refs/heads/main', 'heads/main', 'v1', 'light', 'refs/tags/v1',
+                git_text(self.repo, 'rev-parse', 'HEAD~2')[:8], git_text(self.repo, 'rev-parse', 'HEAD~2')]
+        for rev in revs:
+            with self.subTest(rev=rev):
+                self.assertEqual(self.store.resolve(rev), git_text(self.repo, 'rev-parse', f'{rev}^{{commit}}'))
+
+    def test_resolve_ignores_non_ref_files(self):
+        git(self.repo, 'branch', 'config', 'HEAD~1')
+        try:
+            self.assertEqual(self.store.resolve('config'), git_text(self.repo, 'rev-parse', 'HEAD~1'))
+        finally:
+            git(self.repo, 'branch', '-D', 'config')
+        for rev in ('objects', 'index', 'refs/../config', 'no-such-branch', 'HEAD~1'):
+            with self.subTest(rev=rev):
+                self.assertIsNone(self.store.resolve(rev))
+
+    def test_resolve_follows_a_moved_nested_ref(self):
+        # Moving refs/heads/feature/x touches neither refs/heads nor packed-refs
+        git(self.repo, 'branch', 'feature/x', 'HEAD~2')
+        try:
+            for target in ('HEAD~2', 'HEAD~1', 'HEAD'):
+                git(self.repo, 'branch', '-f', 'feature/x', target)
+                with self.subTest(target=target):
+                    expected = git_text(self.repo, 'rev-parse', target)
+                    self.assertEqual(self.store.resolve('feature/x'), expected)
+                    self.assertEqual(git_batch.object_info(self.repo, 'feature/x^{commit}')[0], expected)
+        finally:
+            git(self.repo, 'branch', '-D', 'feature/x')
+            git_batch.close_all()
+
+    def test_commit_details_match_git_log(self):
+        for oid in git_text(self.repo, 'rev-list', '--all').split():
+            with self.subTest(oid=oid):
+                expected = git_text(self.repo, 'log', '-1', '--pretty=format:%H|%an|%ae|%ad|%s', '--date=iso', oid)
+                details = self.store.commit_details(oid)
+                self.assertEqual('|'.join([details['hash'], details['author_name'], details['author_email'],
+                                           details['date'], details['message']]), expected)
+
+    def test_walk_commits_matches_rev_list(self):
+        head = git_text(self.repo, 'rev-parse', 'HEAD')
+        start = git_text(self.repo, 'rev-parse', 'HEAD~6')
+        self.assertEqual(list(self.store.walk_commits(head)), git_text(self.repo, 'rev-list', head).split())
+        self.assertEqual(list(self.store.walk_commits(head, exclude=start)),
+                         git_text(self.repo, 'rev-list', f'{start}..{head}').split())
+
+    def test_walk_tree_matches_ls_tree(self):
+        head = git_text(self.repo, 'rev-parse', 'HEAD')
+        listing = git(self.repo, 'ls-tree', '-r', '-z', head).decode('utf-8').split('\0')
+        expected = []
+        for line in filter(None, listing):
+            meta, path = line.split('\t', 1)
+            mode, _, oid = meta.split()
+            expected.append((path, mode.lstrip('0'), oid))
+        tree = self.store.read_commit(head)['tree']
+        self.assertEqual(sorted(self.store.walk_tree(tree)), sorted(expected))
+
+    def test_diff_trees_matches_diff_tree(self):
+        commits = git_text(self.repo, 'rev-list', '--all').split()
+        pairs = [(None, commits[-1])] + [(a, b) for a, b in zip(commits[1:], commits)]
+        pairs.append((commits[-1], commits[0]))
+        for old, new in pairs:
+            with self.subTest(old=old, new=new):
+                args = ['diff-tree', '-r', '-z', '--no-renames', old or EMPTY_TREE_SHA, new]
+                fields = git(self.repo, *args).decode('utf-8').split('\0')
+                expected = set()
+                for meta, path in zip(fields[0::2], fields[1::2]):
+                    if not meta.startswith(':'):
+                        continue
+                    old_mode, new_mode, old_oid, new_oid, status = meta[1:].split()
+                    expected.add((path, status,
+                                  None if status == 'A' else old_mode.lstrip('0'),
+                                  None if status == 'D' else new_mode.lstrip('0'),
+                                  None if status == 'A' else old_oid, None if status == 'D' else new_oid))
+                changes = diff_commits(self.store, old, new)
+                self.assertEqual(set((c['path'], c['status'], c['old_mode'], c['new_mode'], c['old_oid'],
+                                      c['new_oid']) for c in changes), expected)
+                for change in changes:
+                    if change['new_oid'] and change['new_mode'] != '160000':
+                        self.assertEqual(change['size'],
+                                         int(git_text(self.repo, 'cat-file', '-s', change['new_oid'])))
+
+    def test_blob_reader_matches_show(self):
+        head = git_text(self.repo, 'rev-parse', 'HEAD')
+        reader = self.store.blob_reader(head)
+        for path in ('big.txt', 'run.sh', 'docs/README.md', 'café/menü.txt', 'link'):
+            with self.subTest(path=path):
+                self.assertEqual(reader.read(path), git(self.repo, 'cat-file', 'blob', f'{head}:{path}'))
+        self.assertIsNone(reader.read('vendor/lib'))  # Gitlink
+        self.assertIsNone(reader.read('src/app/main.py'))  # Deleted
+        self.assertIs(self.store.blob_reader(head), reader)
+
+    def test_concurrent_readers(self):
+        commits = git_text(self.repo, 'rev-list', '--all').split()
+        errors = []
+
+        def work(offset):
+            try:
+                for i in range(200):
+                    oid = commits[(i + offset) % len(commits)]
+                    reader = self.store.blob_reader(oid)
+                    reader.read('big.txt')
+                    self.store.resolve('main')
+                    if i % 50 == 0:
+                        self.store._pack_state = None  # Force a rescan
+                        self.store.refresh()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_refresh_picks_up_new_packs(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            repo = shutil.copytree(self.repo, os.path.join(tmp, 'repo'), symlinks=True)
+            store = GitObjectStore(repo)
+            try:
+                write(repo, 'new.txt', b'new\n')
+                oid = commit(repo, 'new', 15)
+                git(repo, 'repack', '-a', '-d', '-q')
+                git(repo, 'prune-packed')
+                self.assertTrue(store.refresh())
+                self.assertEqual(store.resolve('main'), oid)
+                self.assertEqual(store.read(oid)[1], git(repo, 'cat-file', 'commit', oid))
+            finally:
+                store.close()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+class GitBatchTest(unittest.TestCase):
+    """The long-lived git processes and streamed patches against one-shot git commands."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.repo = make_repository(os.path.join(cls.tmp, 'repo'))
+
+    @classmethod
+    def tearDownClass(cls):
+        git_batch.close_all()
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def test_changed_entries_match_ls_tree(self):
+        for oid in git_text(self.repo, 'rev-list', '--all').split():
+            with self.subTest(oid=oid):
+                expected = git(self.repo, '-c', 'core.quotePath=false', 'diff-tree', '-r', '--name-only', '-z',
+                               '--no-commit-id', '--root', '--cc', '-M', oid).decode('utf-8').split('\0')
+                changes = git_batch.changed_entries(self.repo, oid)
+                self.assertEqual([path for path, _, _ in changes], [path for path in expected if path])
+                for path, mode, blob in changes:
+                    listing = git(self.repo, 'ls-tree', '-z', oid, '--', path).decode('utf-8')
+                    if mode == '000000':
+                        self.assertEqual(listing, '')
+                    else:
+                        meta = listing.split('\t', 1)[0].split()
+                        self.assertEqual((meta[0], meta[2]), (mode, blob))
+
+    def test_streamed_patches_match_format_patch(self):
+        from git_archive_by_date import format_commit_patch, iter_commit_patches
+        patches = list(iter_commit_patches(self.repo, ['main']))
+        self.assertEqual([oid for oid, _ in patches], git_text(self.repo, 'rev-list', '--no-merges', 'main').split())
+        for oid, patch in patches:
+            with self.subTest(oid=oid):
+                self.assertEqual(patch, format_commit_patch(self.repo, oid))
+
+
+class RefDeltaObjectStoreTest(GitObjectStoreTest):
+    """The same checks on a pack whose deltas name their base by OID."""
+    ofs_delta = False
+
+
+if __name__ == '__main__':
+    unittest.main()
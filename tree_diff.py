@@ -0,0 +1,88 @@
+# In-process tree-diff engine built on the pure-Python object store.
+# Walks two root trees side by side and skips any subtree whose OID is
+# unchanged, so the cost is proportional to what changed rather than to
+# the size of the repository.
+
+TREE_MODE = '40000'
+GITLINK_MODE = '160000'
+
+
+def _tree_dict(store, tree_hexsha):
+    if not tree_hexsha:
+        return {}
+    return {name: (mode, hexsha) for mode, name, hexsha in store.read_tree(tree_hexsha)}
+
+
+def _change(store, path, status, old, new, with_sizes):
+    """Build a change record; sizes are read from object headers only."""
+    new_mode, new_oid = new if new else (None, None)
+    old_mode, old_oid = old if old else (None, None)
+    size = None
+    if with_sizes and new_oid and new_mode != GITLINK_MODE:
+        size = store.object_size(new_oid)
+    return {
+        'path': path,
+        'status': status,
+        'old_mode': old_mode,
+        'new_mode': new_mode,
+        'old_oid': old_oid,
+        'new_oid': new_oid,
+        'size': size
+    }
+
+
+def _side(store, tree_hexsha, path, status, with_sizes):
+    """Emit every entry of a subtree that exists on only one side."""
+    for sub_path, mode, hexsha in store.walk_tree(tree_hexsha, path + '/'):
+        if status == 'A':
+            yield _change(store, sub_path, 'A', None, (mode, hexsha), with_sizes)
+        else:
+            yield _change(store, sub_path, 'D', (mode, hexsha), None, with_sizes)
+
+
+def diff_trees(store, old_tree, new_tree, prefix='', with_sizes=True):
+    """
+    Yield change records for every path that differs between two trees.
+    Each record has path, status (A/M/D/T), old/new mode and OID and, for
+    paths present in the new tree, the blob size. Renames are reported as
+    a deletion plus an addition (no similarity detection).
+    """
+    if old_tree == new_tree:
+        return
+    old_entries = _tree_dict(store, old_tree)
+    new_entries = _tree_dict(store, new_tree)
+
+    for name in sorted(set(old_entries) | set(new_entries)):
+        old = old_entries.get(name)
+        new = new_entries.get(name)
+        if old == new:
+            continue
+        path = f"{prefix}{name}"
+        old_is_tree = old is not None and old[0] == TREE_MODE
+        new_is_tree = new is not None and new[0] == TREE_MODE
+
+        if old_is_tree and new_is_tree:
+            yield from diff_trees(store, old[1], new[1], path + '/', with_sizes)
+            continue
+
+        if old_is_tree:
+            yield from _side(store, old[1], path, 'D', with_sizes)
+            old = None
+        if new_is_tree:
+            yield from _side(store, new[1], path, 'A', with_sizes)
+            new = None
+
+        if old and new:
+            status = 'M' if old[0] == new[0] or {old[0], new[0]} <= {'100644', '100755'} else 'T'
+            yield _change(store, path, status, old, new, with_sizes)
+        elif new:
+            yield _change(store, path, 'A', None, new, with_sizes)
+        elif old:
+            yield _change(store, path, 'D', old, None, with_sizes)
+
+
+def diff_commits(store, old_commit, new_commit, with_sizes=True):
+    """Diff the root trees of two commits (old_commit may be None for a root)."""
+    old_tree = store.read_commit(old_commit)['tree'] if old_commit else None
+    new_tree = store.read_commit(new_commit)['tree']
+    return list(diff_trees(store, old_tree, new_tree, with_sizes=with_sizes))